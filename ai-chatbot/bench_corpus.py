@@ -0,0 +1,70 @@
+"""Fixed message corpora shared by the load test and benchmarks"""
+
+ENGLISH_MESSAGES = [
+    "hello", "hi there!", "good morning", "how do i vote", "how to vote",
+    "am i eligible to vote?", "how to register", "where to vote on election day",
+    "who are the candidates", "show all candidates", "who is running for captain",
+    "sk chairman candidates", "is it secure?", "who won?", "why vote",
+    "forgot my password", "what is the role of kagawad", "thank you", "thanks!",
+    "goodbye", "help", "what can you do", "this is so annoying, it's broken",
+    "awesome, very helpful", "Juan Dela Cruz", "tell me about maria santos",
+]
+
+TAGALOG_MESSAGES = [
+    "kumusta", "magandang umaga po", "paano bumoto?", "paano ako bumoto sa barangay",
+    "sino ang mga kandidato", "sino tumatakbo sa kapitan", "lahat ng kandidato",
+    "ilang taon para bumoto", "saan magparehistro", "ligtas ba ang boto ko",
+    "kailan ang halalan para bumoto", "sino ang nanalo", "bakit bumoto",
+    "hindi gumagana ang site", "ano ang tungkulin ng kagawad", "maraming salamat po",
+    "salamat", "paalam", "tulong", "nakakainis, hindi ko makita", "ang galing, salamat!",
+    "sino si pedro reyes",
+]
+
+TAGLISH_MESSAGES = [
+    "paano mag vote", "pwede ko ba mag vote", "eligible ba ako", "paano mag-vote please",
+    "ano ang requirements para bumoto", "how bumoto sa mayombo", "ano eligibility ng sk",
+    "pwede ba ako bumoto kahit 17", "mag vote na tayo", "sino running for kagawad",
+    "thanks po sa help", "ok maraming salamat",
+]
+
+ALL_MESSAGES = ENGLISH_MESSAGES + TAGALOG_MESSAGES + TAGLISH_MESSAGES
+
+# (weight, turns) - multi-turn sequences exercise session follow-ups
+CONVERSATIONS = [
+    (10, ["sino ang kapitan", "and for sk?", "how about kagawad"]),
+    (8, ["hello", "paano bumoto?", "salamat"]),
+    (8, ["hi", "how do i vote", "thanks"]),
+    (6, ["paano mag vote", "eligible ba ako", "saan magparehistro", "ok maraming salamat"]),
+    (6, ["who are the candidates", "Juan Dela Cruz", "thank you"]),
+    (5, ["sk chairman", "and kapitan?"]),
+    (5, ["kagawad", "and for sk?", "paalam"]),
+    (4, ["is it secure?", "who won?", "bye"]),
+    (4, ["juan dela krus", "maria santo"]),
+    (3, ["this is so annoying, it's broken", "help"]),
+    (3, ["hindi gumagana ang site", "tulong"]),
+] + [(1, [message]) for message in ALL_MESSAGES]
+
+
+
+def synthetic_roster_rows(size: int, seed: int = 7) -> list:
+    """Build `size` plausible candidate CSV rows (Position, Candidate ID, Candidate Name, Party, Votes)"""
+    import random
+    
+    rng = random.Random(seed)
+    first = ["Juan", "Maria", "Jose", "Ana", "Pedro", "Rosa", "Mark", "Grace", "Liza",
+             "Carlo", "Miguel", "Angela", "Joy", "Ramon", "Teresa", "Paolo", "Kristine"]
+    syllables = ["ba", "ca", "da", "ga", "la", "ma", "na", "pa", "ra", "sa", "ta", "yo", "li", "no", "ko"]
+    parties = ["Team Bayanihan", "Bagong Pag-asa", "Kapwa Ko", "Youth Power", "Independent"]
+    positions = ["Barangay Kapitan", "SK Chairman", "Barangay Kagawad"]
+    
+    rows = []
+    seen = set()
+    while len(rows) < size:
+        surname = "".join(rng.choice(syllables) for _ in range(rng.randint(2, 4))).title()
+        name = f"{rng.choice(first)} {surname}"
+        if name in seen:
+            continue
+        seen.add(name)
+        position = positions[len(rows) % 3]
+        rows.append([position, f"SYN{len(rows):05d}", name, rng.choice(parties), "0"])
+    return rows
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Microbenchmarks for the per-message hot paths, with stored baselines
+
+    python benchmark.py run                          # print results
+    python benchmark.py run --save                   # also write benchmark_baseline.json
+    python benchmark.py compare                      # re-run and compare with the baseline
+    python benchmark.py compare --threshold 0.10 --baseline other.json
+
+Every result is microseconds per call (best of several repeats over a fixed
+corpus). `compare` exits with status 1 when any benchmark is slower than the
+baseline by more than the threshold, so it can gate changes to
+config.INTENT_PATTERNS or the keyword lists.
+"""
+
+import argparse
+import csv
+import json
+import os
+import platform
+import sys
+import tempfile
+import timeit
+from typing import Callable, Dict, List
+
+from bench_corpus import ALL_MESSAGES, ENGLISH_MESSAGES, TAGALOG_MESSAGES, synthetic_roster_rows
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+ROSTER_SIZES = (100, 1000, 10000)
+KEYWORD_LIST_SIZE = 3000
+REPEATS = 7
+
+
+def time_per_call(func: Callable, items: List, repeats: int = REPEATS, min_seconds: float = 0.05) -> float:
+    """Best-of-`repeats` microseconds per call of func(item) over items"""
+    def run_corpus():
+        for item in items:
+            func(item)
+
+    timer = timeit.Timer(run_corpus)
+    loops, elapsed = timer.autorange()
+    while elapsed < min_seconds:
+        loops *= 2
+        elapsed = timer.timeit(loops)
+    best = min(timer.repeat(repeat=repeats, number=loops))
+    return best / (loops * len(items)) * 1e6
+
+
+def load_roster(size: int):
+    """CandidateManager loaded from a synthetic CSV with `size` candidates"""
+    from candidate_manager import CandidateManager
+
+    rows = synthetic_roster_rows(size)
+    fd, path = tempfile.mkstemp(suffix=".csv")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(["Position", "Candidate ID", "Candidate Name", "Party", "Votes"])
+            writer.writerows(rows)
+        manager = CandidateManager(csv_path=path)
+    finally:
+        os.remove(path)
+    return manager, [row[2] for row in rows]
+
+
+def run_benchmarks() -> Dict[str, float]:
+    """Run every benchmark and return name -> microseconds per call"""
+    from nlp_utils import (
+        detect_intent, detect_language, detect_vibe, detect_language_and_vibe,
+        clean_response, add_conversational_flair
+    )
+    from text_matcher import KeywordAutomaton
+    from responses import RESPONSES
+    from session_manager import SessionManager
+
+    results: Dict[str, float] = {}
+    results["detect_intent"] = time_per_call(detect_intent, ALL_MESSAGES)
+    results["detect_language"] = time_per_call(detect_language, ALL_MESSAGES)
+    results["detect_vibe/english"] = time_per_call(lambda m: detect_vibe(m, "english"), ENGLISH_MESSAGES)
+    results["detect_vibe/tagalog"] = time_per_call(lambda m: detect_vibe(m, "tagalog"), TAGALOG_MESSAGES)
+    results["detect_language_and_vibe"] = time_per_call(detect_language_and_vibe, ALL_MESSAGES)
+    
+    # Optional n-gram model (skipped without numpy); batch = whole corpus in one call
+    from ngram_classifier import NgramClassifier, load_training_data, np
+    if np is not None:
+        model = NgramClassifier.train(*load_training_data())
+        results["ngram_classify"] = time_per_call(model.classify, ALL_MESSAGES)
+        results["ngram_classify_batch/per_message"] = time_per_call(
+            model.classify_batch, [ALL_MESSAGES], repeats=3
+        ) / len(ALL_MESSAGES)
+    
+    # Keyword lists grown to thousands: one automaton pass vs one substring test per keyword
+    keywords = [row[2].split()[1].lower() for row in synthetic_roster_rows(KEYWORD_LIST_SIZE)]
+    automaton = KeywordAutomaton((keyword, keyword) for keyword in keywords)
+    lowered = [m.lower() for m in ALL_MESSAGES]
+    results[f"keyword_scan/substring/{KEYWORD_LIST_SIZE}"] = time_per_call(
+        lambda m: [k for k in keywords if k in m], lowered, repeats=3
+    )
+    results[f"keyword_scan/automaton/{KEYWORD_LIST_SIZE}"] = time_per_call(automaton.matched_values, lowered)
+
+    templates = [(intent, t) for intent, ts in RESPONSES.items() for t in ts]
+    results["clean_response"] = time_per_call(lambda item: clean_response(*item), templates)
+    results["add_conversational_flair"] = time_per_call(
+        lambda item: add_conversational_flair(item[1], item[0], "tagalog"), templates
+    )
+
+    manager = SessionManager(max_sessions=100000)
+    sessions = [manager.get_session(f"10.0.{i // 256}.{i % 256}") for i in range(len(ALL_MESSAGES))]
+    turns = list(zip(sessions, ALL_MESSAGES))
+    results["update_session"] = time_per_call(
+        lambda item: manager.update_session(item[0], item[1], "voting_process", language="tagalog"), turns
+    )
+
+    # Instrumentation overhead per /chat request (all stage laps plus finish)
+    from metrics import Metrics, CHAT_STAGES
+    
+    def timed_request(metrics):
+        timer = metrics.timer()
+        for stage in CHAT_STAGES:
+            timer.lap(stage)
+        timer.finish("voting_process", "tagalog")
+    
+    results["metrics_overhead/enabled"] = time_per_call(timed_request, [Metrics(enabled=True)])
+    results["metrics_overhead/disabled"] = time_per_call(timed_request, [Metrics(enabled=False)])
+    
+    for size in ROSTER_SIZES:
+        candidates, names = load_roster(size)
+        # Mostly misses (ordinary questions) plus some messages naming a candidate
+        lookups = ALL_MESSAGES + [f"sino si {name.lower()}?" for name in names[:10]]
+        results[f"get_candidate_info/{size}"] = time_per_call(candidates.get_candidate_info, lookups)
+        results[f"find_candidate_fuzzy/{size}"] = time_per_call(
+            candidates.find_candidate_fuzzy, ALL_MESSAGES[:10] + [f"{name[:-1]}" for name in names[:5]],
+            repeats=3,
+        )
+
+    return results
+
+
+def print_results(results: Dict[str, float]):
+    """Print results as a table"""
+    print("=" * 60)
+    print("⏱️  MICROBENCHMARKS (µs per call)")
+    print("=" * 60)
+    for name, micros in results.items():
+        print(f"{name:.<45} {micros:>10.2f}")
+
+
+def compare(baseline: Dict[str, float], current: Dict[str, float], threshold: float) -> List[str]:
+    """Print a comparison table and return the names that regressed"""
+    regressions = []
+    print("=" * 72)
+    print(f"📊 COMPARISON (flagging slowdowns above {threshold:.0%})")
+    print("=" * 72)
+    print(f"{'benchmark':<36} {'baseline':>10} {'current':>10} {'change':>9}")
+    for name, micros in current.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<36} {'-':>10} {micros:>10.2f} {'new':>9}")
+            continue
+        change = (micros - base) / base if base else 0.0
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  ❌ SLOWER"
+        print(f"{name:<36} {base:>10.2f} {micros:>10.2f} {change:>+8.1%}{flag}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks for nlp_utils and managers")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = sub.add_parser("run", help="Run the benchmarks")
+    run_parser.add_argument("--save", action="store_true", help="Write results as the new baseline")
+    run_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+
+    compare_parser = sub.add_parser("compare", help="Run and compare against a baseline")
+    compare_parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    compare_parser.add_argument("--threshold", type=float, default=0.20,
+                                help="Allowed slowdown as a fraction (default 0.20 = 20%%)")
+    args = parser.parse_args()
+
+    results = run_benchmarks()
+
+    if args.command == "run":
+        print_results(results)
+        if args.save:
+            with open(args.baseline, "w", encoding="utf-8") as f:
+                json.dump({"python": platform.python_version(), "machine": platform.machine(),
+                           "results": results}, f, indent=2)
+            print(f"\n[OK] Baseline saved to {args.baseline}")
+        return 0
+
+    if not os.path.exists(args.baseline):
+        print(f"[ERROR] No baseline at {args.baseline}; run 'python benchmark.py run --save' first")
+        return 2
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)["results"]
+
+    regressions = compare(baseline, results, args.threshold)
+    if regressions:
+        print(f"\n❌ {len(regressions)} benchmark(s) slower than baseline: {', '.join(regressions)}")
+        return 1
+    print("\n✅ No slowdowns above threshold")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
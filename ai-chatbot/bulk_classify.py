@@ -0,0 +1,253 @@
+#!/usr/bin/env python3
+"""
+Offline bulk classification of logged chat messages
+
+Streams a JSONL or CSV file of messages through classify_message (intent,
+confidence, language, vibe) on a process pool. Results are written as a
+stream, in input order, as JSONL or CSV (chosen by the output extension).
+
+    python bulk_classify.py messages.jsonl -o classified.jsonl
+    python bulk_classify.py messages.csv -o classified.csv --workers 8 --chunk-size 1000
+    python bulk_classify.py messages.jsonl --summary-only
+
+If the input rows carry labels (--intent-field / --language-field, "intent"
+and "language" by default), an accuracy and confusion summary comparing the
+labels with the predictions is printed to stderr. Rows that are not JSON
+objects are skipped and counted in that summary instead of stopping the run.
+
+The input is read in chunks and only a bounded number of chunks (two per
+worker) are in flight at once, so memory stays flat whatever the file size.
+Workers are warmed up before the first chunk: compiled patterns and the
+keyword automaton are built once per process. CHATBOT_CLASSIFIER applies
+to the workers as it does to the server.
+"""
+
+import argparse
+import csv
+import io
+import json
+import os
+import sys
+import time
+from collections import Counter, deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from itertools import chain, islice
+from typing import Deque, Dict, Iterator, List, NamedTuple, Optional, TextIO, Tuple, Union
+
+from nlp_utils import classify_message
+
+RESULT_FIELDS = ("intent", "confidence", "language", "vibe")
+PREDICTED_FIELDS = tuple(f"predicted_{field}" for field in RESULT_FIELDS)
+SUMMARY_TASKS = ("intent", "language")
+
+
+class ChunkOptions(NamedTuple):
+    """Everything a worker needs besides the rows themselves"""
+    text_field: str
+    label_fields: Tuple[Tuple[str, str], ...]  # (task, input field holding its label)
+    output: Optional[str]  # "jsonl", "csv" or None for summary only
+    columns: Tuple[str, ...]  # CSV output columns
+
+
+class ChunkResult(NamedTuple):
+    text: str
+    rows: int
+    bad_rows: int  # Malformed JSON or not an object; skipped
+    pairs: Dict[str, Counter]  # task -> Counter of (label, prediction)
+
+
+def _init_worker():
+    """Process-pool initializer: build every compiled pattern before real work arrives"""
+    classify_message("warm up")
+
+
+def classify_chunk(rows: List[Union[str, Dict]], options: ChunkOptions) -> ChunkResult:
+    """Pool job: parse, classify, count and serialize one chunk
+
+    Rows are raw JSONL lines or CSV dicts. Doing everything but the file I/O
+    here keeps the parent process from becoming the bottleneck.
+    """
+    pairs = {task: Counter() for task, _ in options.label_fields}
+    out = io.StringIO()
+    writer = None
+    if options.output == "csv":
+        writer = csv.DictWriter(out, fieldnames=options.columns, extrasaction="ignore")
+
+    bad_rows = 0
+    for row in rows:
+        if isinstance(row, str):
+            row = _parse_object(row)
+            if row is None:
+                bad_rows += 1
+                continue
+        message = row.get(options.text_field)
+        result = classify_message(message if isinstance(message, str) else "")
+        predicted = dict(zip(RESULT_FIELDS, result))
+
+        for task, field in options.label_fields:
+            label = row.get(field)
+            if label not in (None, ""):
+                pairs[task][(str(label).strip().lower(), predicted[task])] += 1
+
+        if options.output is not None:
+            row.update(zip(PREDICTED_FIELDS, result))
+            if writer is not None:
+                writer.writerow(row)
+            else:
+                out.write(json.dumps(row, ensure_ascii=False) + "\n")
+
+    return ChunkResult(out.getvalue(), len(rows) - bad_rows, bad_rows, pairs)
+
+
+def _parse_object(line: str) -> Optional[Dict]:
+    """A JSONL line as a dict, or None if it is malformed or not an object"""
+    try:
+        row = json.loads(line)
+    except ValueError:
+        return None
+    return row if isinstance(row, dict) else None
+
+
+def read_chunks(path: str, size: int) -> Tuple[Tuple[str, ...], Iterator[List[Union[str, Dict]]]]:
+    """Input columns (as far as known up front) and a lazy stream of row chunks
+
+    JSONL rows stay unparsed strings so the workers do the decoding; CSV rows
+    need the csv module's quoting rules and are split into dicts here.
+    """
+    f = open(path, "r", encoding="utf-8", newline="")
+    if path.endswith(".csv"):
+        reader = csv.DictReader(f)
+        columns = tuple(reader.fieldnames or ())
+        rows: Iterator = iter(reader)
+    else:
+        rows = (line for line in f if line.strip())
+        # Columns come from the first valid row; lines read while looking are still classified
+        head = []
+        columns = ()
+        for line in islice(rows, size):
+            head.append(line)
+            first = _parse_object(line)
+            if first is not None:
+                columns = tuple(first)
+                break
+        rows = chain(head, rows)
+
+    def chunks():
+        with f:
+            while True:
+                chunk = list(islice(rows, size))
+                if not chunk:
+                    return
+                yield chunk
+
+    return columns, chunks()
+
+
+def classify_stream(chunks: Iterator[List], options: ChunkOptions, workers: int) -> Iterator[ChunkResult]:
+    """Chunk results in input order
+
+    With workers > 0 up to 2 * workers chunks are queued on the pool; the
+    next chunk is only read once the oldest one has been written out.
+    """
+    if workers <= 0:
+        for chunk in chunks:
+            yield classify_chunk(chunk, options)
+        return
+
+    with ProcessPoolExecutor(workers, initializer=_init_worker) as pool:
+        pending: Deque[Future] = deque()
+        for chunk in chunks:
+            pending.append(pool.submit(classify_chunk, chunk, options))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+
+class ConfusionSummary:
+    """Per-task counts of (label, prediction) pairs; size depends only on the label sets"""
+
+    def __init__(self, tasks: Tuple[str, ...] = SUMMARY_TASKS):
+        self.pairs: Dict[str, Counter] = {task: Counter() for task in tasks}
+        self.rows = 0
+        self.bad_rows = 0
+
+    def add(self, result: ChunkResult):
+        self.rows += result.rows
+        self.bad_rows += result.bad_rows
+        for task, pairs in result.pairs.items():
+            self.pairs[task].update(pairs)
+
+    def report(self, stream: TextIO = sys.stderr, top: int = 10):
+        if self.bad_rows:
+            print(f"⚠️  Skipped {self.bad_rows} malformed rows (invalid JSON or not an object)", file=stream)
+        for task, pairs in self.pairs.items():
+            labelled = sum(pairs.values())
+            if not labelled:
+                continue
+            correct = sum(count for (label, guess), count in pairs.items() if label == guess)
+            print("=" * 60, file=stream)
+            print(f"🎯 {task.upper()}: {correct / labelled:.1%} of {labelled} labelled rows", file=stream)
+            print("=" * 60, file=stream)
+            confusions = [(pair, count) for pair, count in pairs.items() if pair[0] != pair[1]]
+            confusions.sort(key=lambda item: -item[1])
+            for (label, guess), count in confusions[:top]:
+                print(f"  {label:<20} -> {guess:<20} {count:>8}", file=stream)
+            if not confusions:
+                print("  no confusions", file=stream)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Classify a file of logged chat messages")
+    parser.add_argument("input", help="JSONL or CSV file of messages")
+    parser.add_argument("-o", "--output", help="Write results here (.jsonl or .csv); default stdout")
+    parser.add_argument("--summary-only", action="store_true", help="Only print the confusion summary")
+    parser.add_argument("--text-field", default="message")
+    parser.add_argument("--intent-field", default="intent", help="Field holding an intent label, if any")
+    parser.add_argument("--language-field", default="language", help="Field holding a language label, if any")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="0 classifies in-process")
+    parser.add_argument("--chunk-size", type=int, default=500, help="Messages per pool job")
+    args = parser.parse_args()
+
+    if args.summary_only:
+        output = None
+    elif args.output and args.output.endswith(".csv"):
+        output = "csv"
+    else:
+        output = "jsonl"
+
+    summary = ConfusionSummary()
+    started = time.perf_counter()
+    out = None
+    try:
+        columns, chunks = read_chunks(args.input, args.chunk_size)
+        options = ChunkOptions(
+            text_field=args.text_field,
+            label_fields=(("intent", args.intent_field), ("language", args.language_field)),
+            output=output,
+            columns=columns + tuple(field for field in PREDICTED_FIELDS if field not in columns)
+        )
+        if output is not None:
+            out = open(args.output, "w", encoding="utf-8", newline="") if args.output else sys.stdout
+            if output == "csv":
+                csv.writer(out).writerow(options.columns)
+        for result in classify_stream(chunks, options, args.workers):
+            summary.add(result)
+            if out is not None:
+                out.write(result.text)
+    except (OSError, ValueError) as e:
+        print(f"[ERROR] {e}", file=sys.stderr)
+        return 1
+    finally:
+        if out is not None and out is not sys.stdout:
+            out.close()
+
+    elapsed = time.perf_counter() - started
+    rate = summary.rows / elapsed if elapsed > 0 else 0.0
+    print(f"[OK] Classified {summary.rows} messages in {elapsed:.2f}s ({rate:,.0f}/s)", file=sys.stderr)
+    summary.report()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
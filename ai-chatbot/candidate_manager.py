@@ -1,37 +1,142 @@
 """Candidate management and knowledge base"""
 
+import asyncio
 import csv
 import os
-from typing import Dict, List
+import re
+import time
+from itertools import islice
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from config import (
+    CANDIDATES_CSV_PATH, CANDIDATE_RELOAD_INTERVAL_SECONDS,
+    FUZZY_MAX_EDIT_DISTANCE, FUZZY_MIN_TRIGRAM_OVERLAP, FUZZY_SHORTLIST_SIZE, FUZZY_SUGGEST_CONFIDENCE,
+    FUZZY_MAX_MESSAGE_WORDS
+)
+from text_matcher import KeywordAutomaton, FuzzyWordIndex, bounded_edit_distance, trigrams
+
+WORD_PATTERN = re.compile(r"[\w'-]+")
+ALL_CANDIDATES_KEY = "__all__"
+
+
+def parse_candidates_csv(csv_path: str) -> Dict[str, List[Dict]]:
+    """Read the candidates CSV into position -> list of {name, party}"""
+    candidates = {"Barangay Kapitan": [], "SK Chairman": [], "Kagawad": []}
+    
+    with open(csv_path, "r", encoding="utf-8") as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            # Hand-edited files may have short or overlong rows (None key/value)
+            clean_row = {k.strip(): (v or "").strip() for k, v in row.items() if isinstance(k, str)}
+            position = clean_row.get("Position", "")
+            name = clean_row.get("Candidate Name", "")
+            party = clean_row.get("Party", "")
+
+            if position == "Barangay Kapitan" and name:
+                candidates["Barangay Kapitan"].append({"name": name, "party": party})
+            elif position == "SK Chairman" and name:
+                candidates["SK Chairman"].append({"name": name, "party": party})
+            elif "kagawad" in position.lower() and name:
+                candidates["Kagawad"].append({"name": name, "party": party})
+    
+    return candidates
+
+
+class Roster:
+    """Snapshot of the candidate list plus every index and cache derived from it
+    
+    A roster is never modified after it is built (apart from filling its render
+    cache), so CandidateManager can replace it with a single assignment.
+    """
+    
+    def __init__(self, candidates: Dict[str, List[Dict]], source_mtime: Optional[float] = None):
+        self.candidates = candidates
+        self.source_mtime = source_mtime
+        self.total = sum(len(v) for v in candidates.values())
+        self.rendered: Dict[str, str] = {}  # position (or ALL_CANDIDATES_KEY) -> display block
+        
+        entries = []
+        fuzzy_entries = []
+        rank = 0
+        for position, position_candidates in candidates.items():
+            for candidate in position_candidates:
+                # rank preserves roster order so the first listed candidate wins
+                entries.append((candidate['name'].lower(), (rank, position, candidate)))
+                fuzzy_entries.append((" ".join(WORD_PATTERN.findall(candidate['name'].lower())), (position, candidate)))
+                rank += 1
+        self.name_index = KeywordAutomaton(entries)
+        self.fuzzy_index = FuzzyWordIndex(fuzzy_entries)
+
+
+class CandidateListing:
+    """The full candidate listing of one roster, as a reply body
+    
+    Iterating yields the pieces (header, one block per position, footer),
+    each rendered or fetched from the cache only when asked for, so a
+    streaming reply can send early pieces first; every iteration starts over.
+    text() is the whole listing, memoized in the roster's render cache.
+    """
+    
+    def __init__(self, manager: "CandidateManager", roster: Roster):
+        self._manager = manager
+        self._roster = roster
+    
+    def __iter__(self) -> Iterator[str]:
+        return self._manager._all_candidates_chunks(self._roster)
+    
+    def text(self) -> str:
+        return self._manager._all_candidates_text(self._roster)
 
 
 class CandidateManager:
     """Manages candidate data loading and retrieval"""
     
-    def __init__(self):
-        self.candidates = {"Barangay Kapitan": [], "SK Chairman": [], "Kagawad": []}
+    def __init__(self, csv_path: str = CANDIDATES_CSV_PATH):
+        self.csv_path = csv_path
+        self._roster = Roster({"Barangay Kapitan": [], "SK Chairman": [], "Kagawad": []})
+        self._reload_lock = asyncio.Lock()
+        self._failed_mtime: Optional[float] = None
+        self.last_reload: Dict = {}
         self.load_candidates()
     
+    @property
+    def candidates(self) -> Dict[str, List[Dict]]:
+        """Position -> candidates of the current roster"""
+        return self._roster.candidates
+    
+    @property
+    def roster_version(self) -> Optional[float]:
+        """Source file mtime of the current roster (changes on every reload)"""
+        return self._roster.source_mtime
+    
+    def _build_roster(self) -> Roster:
+        """Parse the CSV and build a complete new roster (safe to run off the event loop)
+        
+        A file without a single candidate row (truncated, mid-write, wrong
+        columns) is refused like a parse error rather than served as empty.
+        """
+        mtime = os.stat(self.csv_path).st_mtime
+        roster = Roster(parse_candidates_csv(self.csv_path), mtime)
+        if not roster.total:
+            raise ValueError(f"No candidate rows found in {self.csv_path}")
+        return roster
+    
+    def _swap_roster(self, roster: Roster, started: float):
+        """Install a fully built roster and record how the load went"""
+        self._roster = roster
+        self._failed_mtime = None
+        self.last_reload = {
+            "status": "ok",
+            "rows": roster.total,
+            "seconds": round(time.perf_counter() - started, 4),
+            "loaded_at": time.time()
+        }
+    
     def load_candidates(self):
         """Load candidates from CSV file"""
-        csv_path = os.path.join(os.path.dirname(__file__), "candidates.csv")
-        
+        started = time.perf_counter()
         try:
-            with open(csv_path, "r", encoding="utf-8") as f:
-                reader = csv.DictReader(f)
-                for row in reader:
-                    clean_row = {k.strip(): v.strip() for k, v in row.items()}
-                    position = clean_row.get("Position", "")
-                    name = clean_row.get("Candidate Name", "")
-                    party = clean_row.get("Party", "")
-
-                    if position == "Barangay Kapitan" and name:
-                        self.candidates["Barangay Kapitan"].append({"name": name, "party": party})
-                    elif position == "SK Chairman" and name:
-                        self.candidates["SK Chairman"].append({"name": name, "party": party})
-                    elif "kagawad" in position.lower() and name:
-                        self.candidates["Kagawad"].append({"name": name, "party": party})
-            
+            self._swap_roster(self._build_roster(), started)
             self._log_loaded_candidates()
         
         except Exception as e:
@@ -39,6 +144,36 @@ class CandidateManager:
             import traceback
             traceback.print_exc()
     
+    async def reload_candidates(self) -> Dict:
+        """Re-read the CSV in a worker thread, then swap the new roster in atomically"""
+        async with self._reload_lock:
+            started = time.perf_counter()
+            try:
+                roster = await asyncio.to_thread(self._build_roster)
+            except Exception as e:
+                # Keep serving the old roster; don't retry the same broken file
+                try:
+                    self._failed_mtime = os.stat(self.csv_path).st_mtime
+                except OSError:
+                    self._failed_mtime = None
+                print(f"[ERROR] Error reloading CSV, keeping previous roster: {e}")
+                return {"status": "error", "error": str(e), "rows": self._roster.total}
+            
+            self._swap_roster(roster, started)
+            print(f"[OK] Reloaded {roster.total} candidates in {self.last_reload['seconds'] * 1000:.1f} ms")
+            return self.last_reload
+    
+    async def watch_candidates_file(self, interval: float = CANDIDATE_RELOAD_INTERVAL_SECONDS):
+        """Background task: reload whenever the CSV's mtime changes"""
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                mtime = os.stat(self.csv_path).st_mtime
+            except OSError:
+                continue
+            if mtime != self._roster.source_mtime and mtime != self._failed_mtime:
+                await self.reload_candidates()
+    
     def _log_loaded_candidates(self):
         """Log loaded candidate counts"""
         print(f"[OK] Loaded {len(self.candidates['Barangay Kapitan'])} Barangay Kapitan candidates")
@@ -50,8 +185,19 @@ class CandidateManager:
         return self.candidates.get(position, [])
     
     def format_candidates(self, position: str) -> str:
-        """Format candidate list for display"""
-        candidates_list = self.get_candidates_by_position(position)
+        """Format candidate list for display (memoized per roster)"""
+        return self._position_block(self._roster, position)
+    
+    def _position_block(self, roster: Roster, position: str) -> str:
+        """Get a position's display block from the roster's render cache"""
+        rendered = roster.rendered.get(position)
+        if rendered is None:
+            rendered = roster.rendered[position] = self._render_position(roster, position)
+        return rendered
+    
+    def _render_position(self, roster: Roster, position: str) -> str:
+        """Build the display block for one position"""
+        candidates_list = roster.candidates.get(position, [])
         
         if not candidates_list:
             return f"Walang nahanap na kandidato para sa {position} sa database."
@@ -70,26 +216,108 @@ class CandidateManager:
         
         return header + candidates_text + footer
     
-    def get_candidate_info(self, message: str) -> str:
+    def format_all_candidates(self) -> str:
+        """Format every position's list as one block (memoized per roster)"""
+        return self._all_candidates_text(self._roster)
+    
+    def iter_all_candidates(self) -> CandidateListing:
+        """format_all_candidates() as a reply body: streamed in pieces, or joined from the memo"""
+        return CandidateListing(self, self._roster)
+    
+    def _all_candidates_text(self, roster: Roster) -> str:
+        rendered = roster.rendered.get(ALL_CANDIDATES_KEY)
+        if rendered is None:
+            rendered = roster.rendered[ALL_CANDIDATES_KEY] = "".join(self._all_candidates_chunks(roster))
+        return rendered
+    
+    def _all_candidates_chunks(self, roster: Roster) -> Iterator[str]:
+        yield "**Lahat ng Kandidato / All Candidates:**\n\n"
+        for position in roster.candidates:
+            yield self._position_block(roster, position) + "\n\n"
+        yield "🗳️ Piliin nang mabuti! Choose wisely!"
+    
+    def find_candidates(self, message: str) -> List[Tuple[str, Dict]]:
+        """Find every candidate whose name appears in the message, in roster order"""
+        found = {rank: (position, candidate)
+                 for _, (rank, position, candidate) in self._roster.name_index.iter_matches(message.lower())}
+        return [found[rank] for rank in sorted(found)]
+    
+    def format_candidate_info(self, position: str, candidate: Dict) -> str:
+        """Format a single candidate's details for display"""
+        return f"**{candidate['name']}**\n\nPosisyon: {position}\nPartido: {candidate['party']}\n\n🎯 Good luck sa lahat ng mga kandidato!\n\nMay iba ka pang gustong malaman tungkol sa kandidatong ito?"
+    
+    def get_candidate_info(self, message: str) -> Optional[str]:
         """Extract specific candidate information from message"""
-        message_lower = message.lower()
-        
-        for position, candidates in self.candidates.items():
-            for candidate in candidates:
-                if candidate['name'].lower() in message_lower:
-                    return f"**{candidate['name']}**\n\nPosisyon: {position}\nPartido: {candidate['party']}\n\n🎯 Good luck sa lahat ng mga kandidato!\n\nMay iba ka pang gustong malaman tungkol sa kandidatong ito?"
+        matches = self.find_candidates(message)
+        if matches:
+            return self.format_candidate_info(*matches[0])
         
         return None
     
+    def find_candidate_fuzzy(self, message: str) -> Optional[Tuple[str, Dict, float]]:
+        """Best typo-tolerant name match as (position, candidate, confidence)
+        
+        Matches are ranked by how many characters of the message they account
+        for (the longer of phrase and name, minus the edit distance), then by
+        confidence: a short name that closely matches part of a long name
+        ("juan dela" for Juan Dala within "juan dela krus") must not beat the
+        long name that matches the whole phrase. When another candidate ties
+        the best match the typo cannot be resolved, so the confidence is
+        capped at FUZZY_SUGGEST_CONFIDENCE ("did you mean", never an answer).
+        
+        Messages longer than FUZZY_MAX_MESSAGE_WORDS words are not looked up
+        at all, so the cost stays bounded whatever the message length.
+        """
+        words = [m.group() for m in islice(WORD_PATTERN.finditer(message.lower()), FUZZY_MAX_MESSAGE_WORDS + 1)]
+        if not words or len(words) > FUZZY_MAX_MESSAGE_WORDS:
+            return None
+        
+        best = None
+        best_rank = None
+        tied = False
+        phrase_grams: Dict[str, set] = {}  # Shortlisted names share the message's phrases
+        for _, name, (position, candidate) in self._roster.fuzzy_index.shortlist(
+                " ".join(words), FUZZY_SHORTLIST_SIZE):
+            name_words = name.count(" ") + 1
+            name_grams = trigrams(name)
+            min_shared = FUZZY_MIN_TRIGRAM_OVERLAP * len(name_grams)
+            # Compare the name against message phrases of about the same word count
+            for size in range(max(1, name_words - 1), name_words + 2):
+                for start in range(0, max(1, len(words) - size + 1)):
+                    phrase = " ".join(words[start:start + size])
+                    if abs(len(phrase) - len(name)) > FUZZY_MAX_EDIT_DISTANCE:
+                        continue
+                    grams = phrase_grams.get(phrase)
+                    if grams is None:
+                        grams = phrase_grams[phrase] = trigrams(phrase)
+                    if len(name_grams & grams) < min_shared:
+                        continue
+                    distance = bounded_edit_distance(phrase, name, FUZZY_MAX_EDIT_DISTANCE)
+                    if distance > FUZZY_MAX_EDIT_DISTANCE:
+                        continue
+                    span = max(len(phrase), len(name))
+                    rank = (span - distance, 1 - distance / span)
+                    if best_rank is None or rank > best_rank:
+                        best_rank = rank
+                        best = (position, candidate, rank[1])
+                        tied = False
+                    elif rank == best_rank and candidate is not best[1]:
+                        tied = True
+        
+        if tied:
+            return best[0], best[1], min(best[2], FUZZY_SUGGEST_CONFIDENCE)
+        return best
+    
     def get_total_candidates(self) -> int:
         """Get total count of all candidates"""
-        return sum(len(v) for v in self.candidates.values())
+        return self._roster.total
     
     def get_stats(self) -> Dict:
         """Get statistics about candidates"""
+        candidates = self.candidates
         return {
             "total": self.get_total_candidates(),
-            "kapitan": len(self.candidates["Barangay Kapitan"]),
-            "sk_chairman": len(self.candidates["SK Chairman"]),
-            "kagawad": len(self.candidates["Kagawad"])
+            "kapitan": len(candidates["Barangay Kapitan"]),
+            "sk_chairman": len(candidates["SK Chairman"]),
+            "kagawad": len(candidates["Kagawad"])
         }
@@ -0,0 +1,144 @@
+"""Run reply composition off the event loop in a thread or process pool"""
+
+import asyncio
+import os
+import random
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Dict, Optional
+
+from config import (
+    CHAT_EXECUTION_MODE, CHAT_EXECUTOR_WORKERS, CHAT_EXECUTOR_QUEUE_SIZE
+)
+from candidate_manager import CandidateManager
+from chat_pipeline import ReplyPlan, compose_reply
+from nlp_utils import classify_message
+from session_store import Session
+
+EXECUTION_MODES = ("inline", "thread", "process")
+
+# Per-process state of a pool worker (process mode only)
+_worker_candidates: Optional[CandidateManager] = None
+
+
+class ExecutorBusy(Exception):
+    """Raised when the bounded job queue is full"""
+
+
+def _init_worker(csv_path: str):
+    """Process-pool initializer: load the roster and warm every compiled pattern"""
+    global _worker_candidates
+    random.seed()  # Forked workers would otherwise share the parent's random state
+    _worker_candidates = CandidateManager(csv_path)
+    classify_message("warm up")
+    _worker_candidates.find_candidate_fuzzy("warm up")
+
+
+def _compose_in_worker(user_msg: str, session: Session, roster_version: Optional[float]) -> ReplyPlan:
+    """Process-pool job: compose a reply against this worker's copy of the roster"""
+    if _worker_candidates.roster_version != roster_version:
+        _follow_parent_roster(roster_version)
+    return _materialize(compose_reply(_worker_candidates, user_msg, session))
+
+
+def _follow_parent_roster(roster_version: Optional[float]):
+    """Reload the worker's roster, but only to the version the parent serves
+
+    If the file on disk is some other version (still being edited, or one the
+    parent refused to load), keep the current roster rather than re-reading
+    the CSV on every job; a later job reloads once the parent has caught up.
+    """
+    try:
+        on_disk = os.stat(_worker_candidates.csv_path).st_mtime
+    except OSError:
+        return
+    if on_disk == roster_version:
+        _worker_candidates.load_candidates()
+
+
+def _materialize(plan: ReplyPlan) -> ReplyPlan:
+    """Render a lazily built body now, while still on the worker"""
+    return plan._replace(body=tuple(plan.body))
+
+
+class ChatExecutor:
+    """Bounded pool that composes replies away from the event loop
+    
+    At most queue_size jobs may be running or waiting at once; further
+    submissions fail fast with ExecutorBusy instead of queueing without limit.
+    Session updates stay on the event loop: only the session-free
+    compose_reply step is offloaded.
+    """
+    
+    def __init__(self, candidates: CandidateManager, mode: str = CHAT_EXECUTION_MODE,
+                 workers: int = CHAT_EXECUTOR_WORKERS, queue_size: int = CHAT_EXECUTOR_QUEUE_SIZE):
+        if mode not in ("thread", "process"):
+            raise ValueError(f"ChatExecutor needs mode 'thread' or 'process', not '{mode}'")
+        self.candidates = candidates
+        self.mode = mode
+        self.workers = workers
+        self.queue_size = queue_size
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self._pool: Optional[Executor] = None
+    
+    def start(self):
+        """Create the pool; process workers are spawned and warmed up front"""
+        if self.mode == "thread":
+            self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="chat")
+            return
+        
+        self._pool = ProcessPoolExecutor(
+            self.workers, initializer=_init_worker, initargs=(self.candidates.csv_path,)
+        )
+        # ProcessPoolExecutor starts workers lazily; one job per worker starts them all now
+        futures = [self._pool.submit(os.getpid) for _ in range(self.workers)]
+        for future in futures:
+            future.result()
+    
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+    
+    async def compose(self, user_msg: str, session: Session) -> ReplyPlan:
+        """compose_reply in the pool; raises ExecutorBusy when the queue is full"""
+        if self.pending >= self.queue_size:
+            self.rejected += 1
+            raise ExecutorBusy()
+        
+        loop = asyncio.get_running_loop()
+        self.pending += 1
+        try:
+            if self.mode == "thread":
+                plan = await loop.run_in_executor(
+                    self._pool, lambda: _materialize(compose_reply(self.candidates, user_msg, session))
+                )
+            else:
+                plan = await loop.run_in_executor(
+                    self._pool, _compose_in_worker, user_msg, session, self.candidates.roster_version
+                )
+        finally:
+            self.pending -= 1
+        self.completed += 1
+        return plan
+    
+    def get_stats(self) -> Dict:
+        """Get pool size and queue counters"""
+        return {
+            "mode": self.mode,
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "pending": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected
+        }
+
+
+def create_chat_executor(candidates: CandidateManager, mode: str = CHAT_EXECUTION_MODE) -> Optional[ChatExecutor]:
+    """Build the configured executor, or None to compose replies on the event loop"""
+    if mode not in EXECUTION_MODES:
+        print(f"[ERROR] Unknown execution mode '{mode}', composing replies inline")
+    elif mode != "inline":
+        return ChatExecutor(candidates, mode)
+    return None
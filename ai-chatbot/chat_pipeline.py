@@ -0,0 +1,122 @@
+"""Session-free reply composition shared by the app and its worker pool"""
+
+import random
+from typing import Iterable, NamedTuple, Optional, Tuple
+
+from config import FUZZY_ANSWER_CONFIDENCE, FUZZY_SUGGEST_CONFIDENCE
+from responses import RESPONSES, RESPONSE_INDEX
+from nlp_utils import (
+    classify_message, conversational_flair, vibe_wrapping, apply_conversational_logic
+)
+from candidate_manager import CandidateManager, CandidateListing
+from session_store import Session
+from metrics import NULL_TIMER
+
+# Intents answered with one position's candidate list
+POSITION_INTENTS = {
+    'kapitan_candidates': "Barangay Kapitan",
+    'sk_candidates': "SK Chairman",
+    'kagawad_candidates': "Kagawad",
+}
+
+
+class ReplyPlan(NamedTuple):
+    """A composed reply plus what update_session needs to record it"""
+    head: str             # Vibe opener and conversational starter
+    body: Iterable[str]   # Main content; several pieces for a full candidate listing
+    tail: str             # Follow-up suggestion and vibe sign-off
+    intent: str           # Intent recorded in the session
+    position: Optional[str]
+    language: str
+    confidence: float     # Classifier confidence and vibe, for the conversation log
+    vibe: str
+
+
+def generate_reply(intent: str, language: str) -> str:
+    """Generate response based on intent and language"""
+    if intent not in RESPONSES:
+        intent = 'unknown'
+    
+    # Templates are pre-filtered by language and pre-cleaned in responses.RESPONSE_INDEX
+    language = 'tagalog' if language == 'tagalog' else 'english'
+    return random.choice(RESPONSE_INDEX[(intent, language)])
+
+
+def did_you_mean_reply(position: str, candidate: dict, language: str) -> str:
+    """Ask the user to confirm a low-confidence candidate name match"""
+    if language == 'tagalog':
+        return f"🤔 Si **{candidate['name']}** ba ang ibig mong sabihin? ({position})\n\nI-type ang buong pangalan para makita ang detalye."
+    return f"🤔 Did you mean **{candidate['name']}**? ({position})\n\nType the full name to see their details."
+
+
+def body_text(body: Iterable[str]) -> str:
+    """A reply body as one string; a full listing comes from its memoized block"""
+    if isinstance(body, CandidateListing):
+        return body.text()
+    return "".join(body)
+
+
+def compose_reply(candidates: CandidateManager, user_msg: str, session: Session,
+                  classification: Optional[Tuple] = None, timer=NULL_TIMER) -> ReplyPlan:
+    """Run the chat pipeline for one non-empty message (reads the session, never writes it)
+    
+    The reply is head + "".join(body) + tail. Keeping the head separate lets
+    streaming clients show it before a long candidate listing.
+    """
+    # Detect intent, language, and vibe (cached per normalized message)
+    if classification is None:
+        classification = classify_message(user_msg)
+    intent, confidence, language, vibe = classification
+    
+    # Apply conversational context logic (session-dependent, never cached)
+    intent = apply_conversational_logic(user_msg, intent, language, session)
+    timer.lap("classify")
+    
+    body = None
+    reply_intent = intent
+    position = None
+    
+    # === HANDLE CANDIDATE QUERIES ===
+    if intent in POSITION_INTENTS:
+        position = POSITION_INTENTS[intent]
+        body = (candidates.format_candidates(position),)
+    
+    elif intent == 'all_candidates':
+        body = candidates.iter_all_candidates()
+    
+    else:
+        # === CHECK FOR SPECIFIC CANDIDATE ===
+        candidate_info = candidates.get_candidate_info(user_msg)
+        
+        # Typo-tolerant fallback only for messages no intent pattern claimed
+        if candidate_info is None and intent == 'unknown':
+            fuzzy_match = candidates.find_candidate_fuzzy(user_msg)
+            if fuzzy_match and fuzzy_match[2] >= FUZZY_ANSWER_CONFIDENCE:
+                candidate_info = candidates.format_candidate_info(fuzzy_match[0], fuzzy_match[1])
+            elif fuzzy_match and fuzzy_match[2] >= FUZZY_SUGGEST_CONFIDENCE:
+                candidate_info = did_you_mean_reply(fuzzy_match[0], fuzzy_match[1], language)
+                reply_intent = 'candidate_suggestion'
+        
+        if candidate_info is not None:
+            body = (candidate_info,)
+            if reply_intent != 'candidate_suggestion':
+                reply_intent = 'candidate_detail'
+    timer.lap("candidate_lookup")
+    
+    # === HANDLE GENERAL INTENTS ===
+    if body is None:
+        body = (generate_reply(intent, language),)
+    
+    # Suggestions are a plain question back to the user: no flair or vibe
+    head = tail = ""
+    if reply_intent != 'candidate_suggestion':
+        starter, closing = conversational_flair(reply_intent, language)
+        opener, sign_off = vibe_wrapping(vibe, language)
+        head = opener + starter
+        tail = closing + sign_off
+    if intent == 'all_candidates':
+        head = head.lstrip()
+        tail = tail.rstrip()
+    timer.lap("response")
+    
+    return ReplyPlan(head, body, tail, reply_intent, position, language, confidence, vibe)
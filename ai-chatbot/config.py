@@ -1,5 +1,7 @@
 """Configuration and constants for the chatbot"""
 
+import os
+
 CORS_ORIGINS = [
     "http://localhost:5174",
     "http://127.0.0.1:5174"
@@ -62,7 +64,7 @@ FOLLOW_UP_SUGGESTIONS = {
 }
 
 INTENT_PATTERNS = [
-    (r'\b(hi|hello|hey|good (morning|afternoon|evening|day)|greetings|g\'day|yo|sup|what\'s up|wassup|hey there|hi there|howdy|how are you|kamusta|kumusta|magandang (umaga|tanghali|hapon|gabi)|kamusta ka|kumusta ka|musta|hellooo|heyy|hey!|hi!|hello!|goodday|gday|greetings!|greetings,|hey there!|hi there!|howdy!|h3ll0|h3llo|h3l0|h3ll0|h3ll0|h3ll0|h3ll0|h3ll0|hiya|hey-hey|yo!|sup!|wassup!|what\'s up!|hola|bonjour|namaste|helloo|heyo|heyy|hey there|hi there|g\'day!|good day!|how are you?|kamusta ka?|kumusta ka?|musta?|h3ll0!|h3llo!|h3l0!|h3ll0!|h3ll0!|hiya!|hey-hey!|yo!|sup!|wassup!|what\'s up!|hola!|bonjour!|namaste!)\b', 'greeting', 1.0),
+    (r'\b(hi|hello|hey|good (morning|afternoon|evening|day)|greetings|g\'day|yo|sup|what\'s up|wassup|hey there|hi there|howdy|how are you|kamusta|kumusta|magandang (umaga|tanghali|hapon|gabi)|kamusta ka|kumusta ka|musta|hellooo|heyy|hey!|hi!|hello!|goodday|gday|greetings!|greetings,|hey there!|hi there!|howdy!|h3ll0|h3llo|h3l0|hiya|hey-hey|yo!|sup!|wassup!|what\'s up!|hola|bonjour|namaste|helloo|heyo|g\'day!|good day!|how are you?|kamusta ka?|kumusta ka?|musta?|h3ll0!|h3llo!|h3l0!|hiya!|hey-hey!|hola!|bonjour!|namaste!)\b', 'greeting', 1.0),
     (r'\b(barangay kapitan|captain|barangay captain|kapitan)\b', 'kapitan_candidates', 0.9),
     (r'\b(sino ang (mga )?kandidato|sino (mga )?tumatakbo|listahan ng kandidato)\b', 'all_candidates', 0.9),
     (r'\b(sk chairman|sk captain|sangguniang kabataan|sk chairperson)\b', 'sk_candidates', 0.9),
@@ -83,3 +85,102 @@ INTENT_PATTERNS = [
     (r'\b(bye|goodbye|exit|quit|paalam|sige na)\b', 'goodbye', 1.0),
     (r'\b(help|what can you do|commands|tulong|ano kaya mong gawin)\b', 'help', 1.0),
 ]
+
+# Fuzzy candidate lookup (typo-tolerant names)
+FUZZY_MAX_EDIT_DISTANCE = 3       # Edits allowed between a message phrase and a name
+FUZZY_MIN_TRIGRAM_OVERLAP = 0.4   # Share of a name's trigrams the message must contain
+FUZZY_SHORTLIST_SIZE = 5          # Names verified with edit distance per lookup
+FUZZY_MAX_MESSAGE_WORDS = 12      # Longer messages are not asking about a name; skip the fuzzy pass
+FUZZY_ANSWER_CONFIDENCE = 0.85    # At or above: answer as if the name was typed exactly
+FUZZY_SUGGEST_CONFIDENCE = 0.7    # At or above (but below answer): ask "did you mean"
+
+# Session store limits
+SESSION_IDLE_TTL_SECONDS = 30 * 60   # Drop sessions idle longer than this
+SESSION_MAX_COUNT = 50000            # Hard cap; least recently used sessions go first
+SESSION_SWEEP_INTERVAL_SECONDS = 60  # How often the background sweeper runs
+SESSION_HISTORY_SIZE = 5             # Recent messages kept per session
+
+# Session backend: "memory" (single worker) or "sqlite" (shared by uvicorn --workers N)
+SESSION_BACKEND = os.environ.get("CHATBOT_SESSION_BACKEND", "memory")
+SESSION_SQLITE_PATH = os.environ.get(
+    "CHATBOT_SESSION_DB", os.path.join(os.path.dirname(__file__), "sessions.db")
+)
+SESSION_CACHE_SIZE = 10000              # Per-worker read-through cache entries
+SESSION_CACHE_TTL_SECONDS = 0.5         # Trust a cached session this long before re-reading
+SESSION_FLUSH_INTERVAL_SECONDS = 0.05   # Batch window for shared-store writes
+
+# Cache of (intent, confidence, language, vibe) per normalized message
+CLASSIFICATION_CACHE_SIZE = 4096
+CLASSIFICATION_CACHE_MAX_CHARS = 256  # Longer messages are classified uncached, so the cache stays ~1 MB
+
+# Candidate roster (hot-reloaded when the file changes)
+CANDIDATES_CSV_PATH = os.environ.get(
+    "CHATBOT_CANDIDATES_CSV", os.path.join(os.path.dirname(__file__), "candidates.csv")
+)
+CANDIDATE_RELOAD_INTERVAL_SECONDS = 5  # mtime polling interval; 0 disables the watcher
+ADMIN_TOKEN = os.environ.get("CHATBOT_ADMIN_TOKEN", "")  # Required by /admin endpoints; empty disables them
+
+# /chat stage timing exported on /metrics (CHATBOT_METRICS=0 switches timing off)
+METRICS_ENABLED = os.environ.get("CHATBOT_METRICS", "1") != "0"
+METRICS_LATENCY_BUCKETS = (  # Seconds; histogram upper bounds
+    0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0
+)
+
+# POST /chat
+CHAT_MAX_MESSAGE_CHARS = 2000  # Longer messages are rejected (422)
+
+# POST /chat/batch (SMS gateway / kiosk fan-in)
+GATEWAY_TOKEN = os.environ.get("CHATBOT_GATEWAY_TOKEN", "")  # Required by /chat/batch; empty disables it
+CHAT_BATCH_MAX_ITEMS = 500
+CHAT_BATCH_MAX_MESSAGE_CHARS = 2000  # Per item; a batch with a longer message is rejected (422)
+
+# /ws/chat WebSocket connections
+WS_IDLE_TIMEOUT_SECONDS = 300   # Close connections with no message for this long
+WS_SEND_TIMEOUT_SECONDS = 10    # Drop clients that stop reading replies
+WS_MAX_MESSAGE_CHARS = 2000     # Longer messages get an error frame instead of a reply
+
+# Where /chat composes replies: "inline" (on the event loop), "thread" or "process" pool
+CHAT_EXECUTION_MODE = os.environ.get("CHATBOT_EXECUTION_MODE", "inline")
+CHAT_EXECUTOR_WORKERS = int(os.environ.get("CHATBOT_EXECUTOR_WORKERS", os.cpu_count() or 2))
+CHAT_EXECUTOR_QUEUE_SIZE = 256  # Jobs running or waiting; beyond this /chat answers 503
+
+# Admission control in front of /chat (rate 0 disables per-user limiting, limit 0 disables the cap)
+RATE_LIMIT_PER_SECOND = float(os.environ.get("CHATBOT_RATE_LIMIT_PER_SECOND", 2.0))  # Sustained messages per user
+RATE_LIMIT_BURST = 10                   # Messages a user may send back to back
+RATE_LIMIT_SWEEP_INTERVAL_SECONDS = 30  # How often fully refilled buckets are dropped
+CHAT_MAX_CONCURRENT = 512               # Requests in flight before /chat answers 503
+
+# /chat single-flight: identical (user, normalized message) requests share one reply
+SINGLE_FLIGHT_REPLAY_SECONDS = 0.5  # Also replay a just-finished reply to retries this long (0 disables)
+
+# Check cached cleaned templates against clean_response at import (CHATBOT_VERIFY_TEMPLATES=1)
+VERIFY_TEMPLATE_CACHE = os.environ.get("CHATBOT_VERIFY_TEMPLATES", "0") == "1"
+
+# Language/vibe detection: "keywords" (default) or "ngram" (hashed char n-gram model, needs numpy)
+CLASSIFIER_MODE = os.environ.get("CHATBOT_CLASSIFIER", "keywords")
+NGRAM_DATASETS = {  # language -> vibe dataset (rows are labelled with text,label)
+    "english": os.path.join(os.path.dirname(__file__), "vibe_dataset_english.csv"),
+    "tagalog": os.path.join(os.path.dirname(__file__), "vibe_dataset_tagalog.csv"),
+}
+NGRAM_WEIGHTS_PATH = os.environ.get(
+    "CHATBOT_NGRAM_WEIGHTS", os.path.join(os.path.dirname(__file__), "ngram_weights.npz")
+)
+NGRAM_FEATURES = 4096        # Hash buckets
+NGRAM_MIN_N = 2              # Character n-gram sizes
+NGRAM_MAX_N = 4
+NGRAM_EPOCHS = 300
+NGRAM_LEARNING_RATE = 2.0
+NGRAM_L2 = 1e-4
+
+# Append-only JSONL conversation log (CHATBOT_CONVERSATION_LOG="" disables it). "{pid}" in the
+# path becomes the process id, so uvicorn --workers N processes never append to or rotate one file
+CONVERSATION_LOG_PATH = os.environ.get(
+    "CHATBOT_CONVERSATION_LOG", os.path.join(os.path.dirname(__file__), "logs", "conversations.{pid}.jsonl")
+)
+CONVERSATION_LOG_MAX_PENDING = 10000          # Buffered entries; beyond this new ones are dropped
+CONVERSATION_LOG_BATCH_SIZE = 1000            # Flush early once this many entries are waiting
+CONVERSATION_LOG_FLUSH_INTERVAL_SECONDS = 1.0
+CONVERSATION_LOG_MAX_BYTES = 50 * 1024 * 1024  # Rotate to <path>.1 past this size
+CONVERSATION_LOG_BACKUPS = 5                  # Rotated files kept
+# Each start writes under new pids; at startup, files of exited processes older than this are deleted
+CONVERSATION_LOG_RETENTION_SECONDS = float(os.environ.get("CHATBOT_CONVERSATION_LOG_RETENTION_DAYS", "7")) * 86400
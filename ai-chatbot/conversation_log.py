@@ -0,0 +1,219 @@
+"""Append-only JSONL conversation log, written off the event loop"""
+
+import asyncio
+import json
+import os
+import re
+import threading
+import time
+from typing import BinaryIO, Dict, List, Optional, Tuple
+
+from config import (
+    CONVERSATION_LOG_PATH, CONVERSATION_LOG_MAX_PENDING, CONVERSATION_LOG_BATCH_SIZE,
+    CONVERSATION_LOG_FLUSH_INTERVAL_SECONDS, CONVERSATION_LOG_MAX_BYTES, CONVERSATION_LOG_BACKUPS,
+    CONVERSATION_LOG_RETENTION_SECONDS
+)
+
+
+def _process_alive(pid: int) -> bool:
+    """Whether pid is a running process (when unsure, assume it is)"""
+    if pid == os.getpid():
+        return True
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except OSError:
+        return True  # e.g. PermissionError: it exists but belongs to another user
+    return True
+
+
+class ConversationLog:
+    """Buffers one entry per answered message and appends them in batches
+
+    log() only appends a tuple to an in-memory list. The run_flusher task
+    hands that list to a thread every flush_interval seconds, or as soon as
+    batch_size entries are waiting; the thread serializes and appends it and
+    rotates the file once it passes max_bytes. While a write is slow, entries
+    keep buffering up to max_pending, after which new ones are dropped and
+    counted rather than growing memory or delaying replies.
+
+    A "{pid}" in the path is replaced with the process id: the file is
+    appended to and rotated without any cross-process locking, so each
+    uvicorn worker must write its own. Every restart therefore starts new
+    files; prune_stale() deletes those of exited processes after retention
+    seconds.
+    """
+
+    def __init__(self, path: str = CONVERSATION_LOG_PATH, max_pending: int = CONVERSATION_LOG_MAX_PENDING,
+                 batch_size: int = CONVERSATION_LOG_BATCH_SIZE,
+                 flush_interval: float = CONVERSATION_LOG_FLUSH_INTERVAL_SECONDS,
+                 max_bytes: int = CONVERSATION_LOG_MAX_BYTES, backups: int = CONVERSATION_LOG_BACKUPS,
+                 retention: float = CONVERSATION_LOG_RETENTION_SECONDS):
+        self.path_template = path
+        self.path = path.replace("{pid}", str(os.getpid()))
+        self.max_pending = max_pending
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.retention = retention
+        self.pruned = 0
+        self.dropped = 0        # Entries refused because the buffer was full (event loop only)
+        self.written = 0        # Entries appended (writer thread only)
+        self.write_errors = 0   # Entries lost to I/O errors (writer thread only)
+        self.rotations = 0
+        self._pending: List[Tuple] = []
+        self._wakeup: Optional[asyncio.Event] = None
+        self._lock = threading.Lock()  # One writer at a time: the flusher thread or close()
+        self._file: Optional[BinaryIO] = None
+        self._size = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    @property
+    def pending(self) -> int:
+        return len(self._pending)
+
+    def log(self, user_key: str, intent: str, confidence: float, language: str, vibe: str,
+            latency_seconds: float):
+        """Queue one entry; never blocks on disk"""
+        if not self.enabled:
+            return
+        if len(self._pending) >= self.max_pending:
+            self.dropped += 1
+            return
+        self._pending.append((time.time(), user_key, intent, confidence, language, vibe, latency_seconds))
+        if len(self._pending) >= self.batch_size and self._wakeup is not None:
+            self._wakeup.set()
+
+    async def run_flusher(self):
+        """Background task: write buffered entries in batches from a worker thread"""
+        self._wakeup = asyncio.Event()
+        while True:
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), self.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wakeup.clear()
+            if self._pending:
+                batch, self._pending = self._pending, []
+                await asyncio.to_thread(self._write, batch)
+
+    def flush(self):
+        """Write everything buffered now, on the calling thread"""
+        if self._pending:
+            batch, self._pending = self._pending, []
+            self._write(batch)
+
+    def prune_stale(self, now: Optional[float] = None) -> int:
+        """Delete files (and rotated backups) of exited processes not written for retention seconds
+
+        Files of running processes, such as sibling workers, are kept however
+        old they are. Called once at startup.
+        """
+        if "{pid}" not in self.path_template or self.retention <= 0:
+            return 0
+        directory, name = os.path.split(self.path_template)
+        prefix, _, suffix = name.partition("{pid}")
+        stale_name = re.compile(re.escape(prefix) + r"(\d+)" + re.escape(suffix) + r"(\.\d+)?$")
+        now = time.time() if now is None else now
+        try:
+            names = os.listdir(directory or ".")
+        except OSError:
+            return 0  # No log directory yet
+
+        removed = 0
+        for entry in names:
+            match = stale_name.match(entry)
+            if match is None or _process_alive(int(match.group(1))):
+                continue
+            file_path = os.path.join(directory, entry)
+            try:
+                if now - os.path.getmtime(file_path) > self.retention:
+                    os.remove(file_path)
+                    removed += 1
+            except FileNotFoundError:
+                pass  # Another worker starting up pruned it first
+            except OSError as e:
+                print(f"[ERROR] Could not prune conversation log {file_path}: {e}")
+        self.pruned += removed
+        return removed
+
+    def close(self):
+        """Flush and close the file (app shutdown)"""
+        self.flush()
+        with self._lock:
+            self._close_file()
+
+    def _write(self, batch: List[Tuple]):
+        data = "".join(
+            json.dumps({
+                "ts": round(ts, 3), "user": user, "intent": intent, "confidence": confidence,
+                "language": language, "vibe": vibe, "latency_ms": round(latency * 1000, 3)
+            }, ensure_ascii=False) + "\n"
+            for ts, user, intent, confidence, language, vibe, latency in batch
+        ).encode("utf-8")
+
+        with self._lock:
+            try:
+                if self._file is None:
+                    self._open()
+                self._file.write(data)
+                self._file.flush()
+            except OSError as e:
+                self.write_errors += len(batch)
+                print(f"[ERROR] Conversation log write failed: {e}")
+                self._close_file()  # Reopen on the next batch
+                return
+            self._size += len(data)
+            self.written += len(batch)
+            if self._size >= self.max_bytes:
+                try:
+                    self._rotate()
+                except OSError as e:
+                    print(f"[ERROR] Conversation log rotation failed: {e}")
+                    self._close_file()
+
+    def _close_file(self):
+        if self._file is not None:
+            try:
+                self._file.close()
+            except OSError:
+                pass
+            self._file = None
+
+    def _open(self):
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._file = open(self.path, "ab")
+        self._size = self._file.tell()
+
+    def _rotate(self):
+        """path -> path.1 -> path.2 ... keeping `backups` old files"""
+        self._close_file()
+        if self.backups > 0:
+            for index in range(self.backups - 1, 0, -1):
+                older = f"{self.path}.{index}"
+                if os.path.exists(older):
+                    os.replace(older, f"{self.path}.{index + 1}")
+            os.replace(self.path, f"{self.path}.1")
+        else:
+            os.remove(self.path)
+        self.rotations += 1
+        self._open()
+
+    def get_stats(self) -> Dict:
+        """Get buffer size and write counters"""
+        return {
+            "enabled": self.enabled,
+            "pending": self.pending,
+            "written": self.written,
+            "dropped": self.dropped,
+            "write_errors": self.write_errors,
+            "rotations": self.rotations,
+            "pruned": self.pruned
+        }
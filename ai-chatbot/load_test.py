@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+"""
+End-to-end load test for the /chat endpoint
+
+Simulated voters replay weighted multi-turn conversations (English, Tagalog
+and Taglish) and the script reports throughput and p50/p95/p99 latency.
+
+    python load_test.py --mode asgi --users 50 --turns 20
+    python load_test.py --mode socket --users 200 --turns 20 --workers 4
+    python load_test.py --url http://127.0.0.1:8000 --users 100
+    python load_test.py --mode socket --compare-modes inline,thread,process
+
+Modes:
+  asgi    drive main:app in-process through httpx.ASGITransport
+  socket  start uvicorn on a free local port and drive it over TCP
+  --url   drive an already-running server
+
+--compare-modes runs the socket test once per CHATBOT_EXECUTION_MODE and
+prints a throughput/latency table for the modes side by side.
+
+Each simulated user gets its own client address (127.0.0.x for sockets), so
+get_user_identifier gives every user a separate session. Simulated voters
+send as fast as the server answers, so the per-user rate limit is switched
+off (CHATBOT_RATE_LIMIT_PER_SECOND=0) for every mode. Requires httpx.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from bench_corpus import CONVERSATIONS
+
+NO_RATE_LIMIT = {"CHATBOT_RATE_LIMIT_PER_SECOND": "0"}
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values))))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def user_address(index: int) -> str:
+    """Distinct loopback address per simulated user (127.0.0.0/8 is all local)"""
+    return f"127.{(index >> 16) & 255}.{(index >> 8) & 255}.{(index & 255) or 1}"
+
+
+async def simulate_user(client: httpx.AsyncClient, turns: int, rng: random.Random,
+                        latencies: List[float], errors: List[str]):
+    """Replay weighted conversations until `turns` messages have been sent"""
+    weights = [weight for weight, _ in CONVERSATIONS]
+    sent = 0
+    while sent < turns:
+        _, conversation = rng.choices(CONVERSATIONS, weights=weights)[0]
+        for message in conversation[:turns - sent]:
+            started = time.perf_counter()
+            try:
+                response = await client.post("/chat", json={"message": message})
+                if response.status_code != 200:
+                    errors.append(f"HTTP {response.status_code}")
+            except httpx.HTTPError as e:
+                errors.append(type(e).__name__)
+            latencies.append(time.perf_counter() - started)
+            sent += 1
+
+
+async def run_load(make_client, users: int, turns: int, seed: int) -> Dict:
+    """Run `users` concurrent simulated voters and summarize latency"""
+    latencies: List[float] = []
+    errors: List[str] = []
+    clients = [make_client(i) for i in range(users)]
+
+    started = time.perf_counter()
+    try:
+        await asyncio.gather(*(
+            simulate_user(client, turns, random.Random(seed + i), latencies, errors)
+            for i, client in enumerate(clients)
+        ))
+    finally:
+        await asyncio.gather(*(client.aclose() for client in clients))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        "users": users,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "seconds": round(elapsed, 3),
+        "throughput_rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 99) * 1000, 2),
+        "max_ms": round(latencies[-1] * 1000, 2) if latencies else 0.0
+    }
+
+
+async def run_asgi(users: int, turns: int, seed: int) -> Dict:
+    """Drive main:app in-process (no network, includes the app lifespan)"""
+    os.environ.update(NO_RATE_LIMIT)
+    from main import app
+
+    def make_client(i: int) -> httpx.AsyncClient:
+        transport = httpx.ASGITransport(app=app, client=(user_address(i + 1), 40000))
+        return httpx.AsyncClient(transport=transport, base_url="http://loadtest")
+
+    async with app.router.lifespan_context(app):
+        return await run_load(make_client, users, turns, seed)
+
+
+async def run_url(url: str, users: int, turns: int, seed: int) -> Dict:
+    """Drive a server over TCP, one keep-alive connection per simulated user"""
+    def make_client(i: int) -> httpx.AsyncClient:
+        transport = httpx.AsyncHTTPTransport(local_address=user_address(i + 1))
+        return httpx.AsyncClient(transport=transport, base_url=url, timeout=30.0)
+
+    return await run_load(make_client, users, turns, seed)
+
+
+def free_port() -> int:
+    """Ask the OS for an unused local TCP port"""
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def start_uvicorn(port: int, workers: int, extra_env: Optional[Dict] = None) -> subprocess.Popen:
+    """Start uvicorn main:app on a local port and wait until /health answers"""
+    env = dict(os.environ, **(extra_env or {}))
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1",
+         "--port", str(port), "--workers", str(workers), "--log-level", "warning"],
+        cwd=os.path.dirname(os.path.abspath(__file__)), env=env,
+        stdout=subprocess.DEVNULL,
+    )
+    deadline = time.time() + 30
+    while time.time() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("uvicorn exited during startup")
+        try:
+            if httpx.get(f"http://127.0.0.1:{port}/health", timeout=1.0).status_code == 200:
+                return process
+        except httpx.HTTPError:
+            time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("uvicorn did not become healthy within 30s")
+
+
+def print_report(label: str, result: Dict):
+    """Print one result block"""
+    print("=" * 60)
+    print(f"📊 LOAD TEST: {label}")
+    print("=" * 60)
+    print(f"Users / requests......... {result['users']} / {result['requests']}")
+    print(f"Errors................... {result['errors']}")
+    print(f"Duration................. {result['seconds']} s")
+    print(f"Throughput............... {result['throughput_rps']} req/s")
+    print(f"Latency p50/p95/p99...... {result['p50_ms']} / {result['p95_ms']} / {result['p99_ms']} ms")
+    print(f"Latency max.............. {result['max_ms']} ms")
+
+
+def run_socket(users: int, turns: int, seed: int, workers: int, extra_env: Optional[Dict] = None) -> Dict:
+    """Start uvicorn on a free port, run the load, then stop the server"""
+    port = free_port()
+    # Several workers only share sessions through the SQLite backend
+    env = {"CHATBOT_SESSION_BACKEND": "sqlite"} if workers > 1 else {}
+    env.update(NO_RATE_LIMIT, **(extra_env or {}))
+    process = start_uvicorn(port, workers, env)
+    try:
+        return asyncio.run(run_url(f"http://127.0.0.1:{port}", users, turns, seed))
+    finally:
+        process.terminate()
+        process.wait()
+
+
+def print_mode_comparison(results: Dict[str, Dict]):
+    """Print one row per execution mode"""
+    print("=" * 72)
+    print("📊 EXECUTION MODES (uvicorn socket)")
+    print("=" * 72)
+    print(f"{'mode':<10} {'req/s':>10} {'p50 ms':>10} {'p95 ms':>10} {'p99 ms':>10} {'errors':>8}")
+    for mode, result in results.items():
+        print(f"{mode:<10} {result['throughput_rps']:>10} {result['p50_ms']:>10} "
+              f"{result['p95_ms']:>10} {result['p99_ms']:>10} {result['errors']:>8}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test the /chat endpoint")
+    parser.add_argument("--mode", choices=["asgi", "socket"], default="asgi")
+    parser.add_argument("--url", help="Target an already-running server instead")
+    parser.add_argument("--users", type=int, default=50, help="Concurrent simulated voters")
+    parser.add_argument("--turns", type=int, default=20, help="Messages sent per voter")
+    parser.add_argument("--workers", type=int, default=1, help="uvicorn workers (socket mode)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", help="Also write the result to this JSON file")
+    parser.add_argument("--compare-modes", help="Comma-separated CHATBOT_EXECUTION_MODE values to compare (socket)")
+    args = parser.parse_args()
+
+    if args.compare_modes:
+        results = {
+            mode: run_socket(args.users, args.turns, args.seed, args.workers, {"CHATBOT_EXECUTION_MODE": mode})
+            for mode in args.compare_modes.split(",")
+        }
+        print_mode_comparison(results)
+        if args.json:
+            with open(args.json, "w", encoding="utf-8") as f:
+                json.dump(results, f, indent=2)
+        return 0 if all(result["errors"] == 0 for result in results.values()) else 1
+
+    if args.url:
+        label = args.url
+        result = asyncio.run(run_url(args.url, args.users, args.turns, args.seed))
+    elif args.mode == "socket":
+        label = f"uvicorn socket, {args.workers} worker(s)"
+        result = run_socket(args.users, args.turns, args.seed, args.workers)
+    else:
+        label = "in-process ASGI"
+        result = asyncio.run(run_asgi(args.users, args.turns, args.seed))
+
+    result["mode"] = label
+    print_report(label, result)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2)
+
+    return 0 if result["errors"] == 0 else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
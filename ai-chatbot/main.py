@@ -1,23 +1,92 @@
 """Main FastAPI application for Mayombo AI Assistant"""
 
-import random
-from fastapi import FastAPI, Request
+import asyncio
+import hmac
+import json
+import math
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, Header, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel
-
-from config import CORS_ORIGINS, APP_TITLE, APP_VERSION
-from responses import RESPONSES
-from nlp_utils import (
-    detect_intent, detect_vibe, detect_language,
-    apply_vibe_to_response, clean_response,
-    add_conversational_flair, apply_conversational_logic
+from pydantic import BaseModel, Field
+
+from config import (
+    CORS_ORIGINS, APP_TITLE, APP_VERSION, CANDIDATE_RELOAD_INTERVAL_SECONDS, ADMIN_TOKEN, CHAT_BATCH_MAX_ITEMS,
+    GATEWAY_TOKEN, CHAT_BATCH_MAX_MESSAGE_CHARS, CHAT_MAX_MESSAGE_CHARS,
+    WS_IDLE_TIMEOUT_SECONDS, WS_SEND_TIMEOUT_SECONDS, WS_MAX_MESSAGE_CHARS
 )
+from nlp_utils import classify_message, normalize_message, get_classification_cache_stats
 from candidate_manager import CandidateManager
+from chat_pipeline import ReplyPlan, body_text, compose_reply
+from chat_executor import ExecutorBusy, create_chat_executor
+from rate_limiter import TokenBucketLimiter, ConcurrencyLimiter, ConcurrencyLimitMiddleware
+from single_flight import SingleFlight, ReplayableIterable
 from session_manager import SessionManager
+from session_store import Session
+from metrics import Metrics, NULL_TIMER
+from conversation_log import ConversationLog
+from prebuilt_json import PrebuiltJSON, PrebuiltJSONMiddleware, encode_json
+
+
+# Initialize managers
+candidate_manager = CandidateManager()
+session_manager = SessionManager()
+metrics = Metrics()
+
+chat_executor = create_chat_executor(candidate_manager)
+rate_limiter = TokenBucketLimiter()
+concurrency_limiter = ConcurrencyLimiter()
+chat_single_flight = SingleFlight()
+conversation_log = ConversationLog()
+
+EMPTY_MESSAGE_REPLY = "Walang mensahe. Ano ang gusto mong itanong? 😊"
+BATCH_SESSION_PREFIX = "batch:"
+SSE_RESPONSE_OPTIONS = {
+    "media_type": "text/event-stream",
+    "headers": {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+}
+SERVER_BUSY_DETAIL = "Server busy, please try again"
+RATE_LIMITED_DETAIL = "Too many messages, please slow down"
+WS_USAGE_ERROR = 'Expected a JSON object like {"message": "..."}'
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Run background maintenance tasks for the lifetime of the app"""
+    if chat_executor is not None:
+        chat_executor.start()
+    tasks = [asyncio.create_task(session_manager.run_sweeper())]
+    if session_manager.store.flush_interval:
+        tasks.append(asyncio.create_task(session_manager.run_flusher()))
+    if CANDIDATE_RELOAD_INTERVAL_SECONDS:
+        tasks.append(asyncio.create_task(candidate_manager.watch_candidates_file()))
+    if conversation_log.enabled:
+        conversation_log.prune_stale()
+        tasks.append(asyncio.create_task(conversation_log.run_flusher()))
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        if chat_executor is not None:
+            chat_executor.shutdown()
+        session_manager.store.close()
+        conversation_log.close()
 
 
 # Initialize FastAPI app
-app = FastAPI(title=APP_TITLE)
+app = FastAPI(title=APP_TITLE, lifespan=lifespan)
+
+# Admission control: chat requests over the concurrency limit get a 503 before
+# the body is even read. Added before CORS so CORS still wraps the 503.
+app.add_middleware(
+    ConcurrencyLimitMiddleware,
+    limiter=concurrency_limiter,
+    paths=("/chat", "/chat/batch"),
+    rejection=encode_json({"detail": SERVER_BUSY_DETAIL})
+)
 
 # Enable CORS
 app.add_middleware(
@@ -33,14 +102,18 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Initialize managers
-candidate_manager = CandidateManager()
-session_manager = SessionManager()
-
-
 # === REQUEST MODEL ===
 class ChatMessage(BaseModel):
-    message: str
+    message: str = Field(max_length=CHAT_MAX_MESSAGE_CHARS)
+
+
+class BatchItem(BaseModel):
+    user_id: str
+    message: str = Field(max_length=CHAT_BATCH_MAX_MESSAGE_CHARS)
+
+
+class ChatBatch(BaseModel):
+    messages: List[BatchItem]
 
 
 # === HELPER FUNCTIONS ===
@@ -49,104 +122,234 @@ def get_user_identifier(request: Request) -> str:
     return request.client.host
 
 
-def generate_reply(intent: str, language: str) -> str:
-    """Generate response based on intent and language"""
-    if intent not in RESPONSES:
-        intent = 'unknown'
-    
-    responses = RESPONSES[intent]
+def token_matches(given: str, expected: str) -> bool:
+    """Constant-time token check; an unset (empty) expected token never matches"""
+    return bool(expected) and hmac.compare_digest(given.encode("utf-8"), expected.encode("utf-8"))
+
+
+def record_reply(session: Session, user_msg: str, plan: ReplyPlan, timer=NULL_TIMER):
+    """Apply a composed reply to the session and finish the request's timing"""
+    session_manager.update_session(session, user_msg, plan.intent, plan.position, plan.language)
+    timer.lap("session_update")
+    timer.finish(plan.intent, plan.language)
+
+
+def log_reply(user_key: str, plan: ReplyPlan, started: float):
+    """Queue a conversation log entry for an answered message"""
+    conversation_log.log(user_key, plan.intent, plan.confidence, plan.language, plan.vibe,
+                         time.perf_counter() - started)
+
+
+def reply_parts(user_msg: str, session: Session, classification: Optional[Tuple] = None,
+                timer=NULL_TIMER) -> ReplyPlan:
+    """Run the chat pipeline for one non-empty message on the event loop and update the session"""
+    plan = compose_reply(candidate_manager, user_msg, session, classification, timer)
+    record_reply(session, user_msg, plan, timer)
+    return plan
+
+
+async def reply_parts_async(user_msg: str, session: Session, timer=NULL_TIMER) -> ReplyPlan:
+    """reply_parts, composed in the worker pool when CHAT_EXECUTION_MODE asks for one
     
-    # Filter responses by detected language
-    if language == 'tagalog':
-        filtered = [r for r in responses if any(
-            word in r.lower() for word in 
-            ['ang ', 'mga ', ' sa ', ' ng ', 'boto', 'kandidato', 'pagboto', 'botante']
-        )]
-    else:  # english
-        filtered = [r for r in responses if not any(
-            marker in r.lower() for marker in 
-            [' ang ', ' mga ', ' sa ', ' ng ']
-        )]
+    Raises ExecutorBusy when the pool's queue is full.
+    """
+    if chat_executor is None:
+        return reply_parts(user_msg, session, timer=timer)
+    plan = await chat_executor.compose(user_msg, session)
+    timer.lap("offload")
+    record_reply(session, user_msg, plan, timer)
+    return plan
+
+
+def sse_event(event: str, data: Dict) -> str:
+    """Format one Server-Sent Event"""
+    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
+
+
+def stream_reply(head: str, body: Iterable[str], tail: str) -> Iterator[str]:
+    """SSE "chunk" events for each reply piece, then "done"
     
-    # Use filtered responses if available, else fallback
-    return random.choice(filtered) if filtered else random.choice(responses)
+    Clients append every chunk's text; position blocks of a full listing
+    are rendered one at a time as the response is sent.
+    """
+    if head:
+        yield sse_event("chunk", {"text": head})
+    for piece in body:
+        yield sse_event("chunk", {"text": piece})
+    if tail:
+        yield sse_event("chunk", {"text": tail})
+    yield sse_event("done", {})
+
+
+def check_rate_limit(key: str):
+    """Take one rate limiter token for key, or raise 429 with Retry-After"""
+    retry_after = rate_limiter.acquire(key)
+    if retry_after:
+        raise HTTPException(status_code=429, detail=RATE_LIMITED_DETAIL,
+                            headers={"Retry-After": str(math.ceil(retry_after))})
+
+
+def wants_stream(request: Request, stream: bool) -> bool:
+    """Streaming is opt-in: ?stream=true or Accept: text/event-stream"""
+    return stream or "text/event-stream" in request.headers.get("accept", "")
 
 
 # === ROUTES ===
 @app.post("/chat")
-async def chat(msg: ChatMessage, request: Request):
-    """Main chat endpoint"""
-    user_msg = msg.message.strip()
+async def chat(msg: ChatMessage, request: Request, stream: bool = False):
+    """Main chat endpoint (Server-Sent Events with ?stream=true)
     
-    if not user_msg:
-        return {"reply": "Walang mensahe. Ano ang gusto mong itanong? 😊"}
-    
-    # Get user identifier and session
+    ConcurrencyLimitMiddleware has already admitted the request; the per-user
+    rate limit is checked here, still before any NLP work.
+    """
     user_id = get_user_identifier(request)
+    check_rate_limit(user_id)
+    return await handle_chat(msg.message.strip(), user_id, wants_stream(request, stream))
+
+
+async def compose_and_record(user_msg: str, user_id: str) -> ReplyPlan:
+    """Full pipeline for one /chat message, with a body that can be shared by several responses"""
+    started = time.perf_counter()
+    timer = metrics.timer()
     session = session_manager.get_session(user_id)
+    plan = await reply_parts_async(user_msg, session, timer)
+    log_reply(session.key, plan, started)
+    if iter(plan.body) is not plan.body:
+        return plan  # Tuples and listings can be iterated again by every response
+    # A one-shot body stays lazy for whichever response reads it first; the others replay it
+    return plan._replace(body=ReplayableIterable(plan.body))
+
+
+async def handle_chat(user_msg: str, user_id: str, streaming: bool):
+    """Answer one admitted /chat request"""
+    if not user_msg:
+        if streaming:
+            return StreamingResponse(stream_reply("", (EMPTY_MESSAGE_REPLY,), ""), **SSE_RESPONSE_OPTIONS)
+        return {"reply": EMPTY_MESSAGE_REPLY}
     
-    # Detect intent, language, and vibe
-    intent, confidence = detect_intent(user_msg)
-    language = detect_language(user_msg)
-    vibe = detect_vibe(user_msg, language)
-    
-    # Apply conversational context logic
-    intent = apply_conversational_logic(user_msg, intent, language, session)
-    
-    # === HANDLE CANDIDATE QUERIES ===
-    if intent == 'kapitan_candidates':
-        reply = candidate_manager.format_candidates("Barangay Kapitan")
-        reply = add_conversational_flair(reply, intent, language)
-        reply = apply_vibe_to_response(reply, vibe, language)
-        session_manager.update_session(session, user_msg, intent, "Barangay Kapitan", language)
-        return {"reply": reply}
+    # Kiosk retries of the same message share one pipeline run and session update
+    try:
+        plan = await chat_single_flight.run(
+            (user_id, normalize_message(user_msg)), lambda: compose_and_record(user_msg, user_id)
+        )
+    except ExecutorBusy:
+        raise HTTPException(status_code=503, detail=SERVER_BUSY_DETAIL)
     
-    elif intent == 'sk_candidates':
-        reply = candidate_manager.format_candidates("SK Chairman")
-        reply = add_conversational_flair(reply, intent, language)
-        reply = apply_vibe_to_response(reply, vibe, language)
-        session_manager.update_session(session, user_msg, intent, "SK Chairman", language)
-        return {"reply": reply}
+    if streaming:
+        return StreamingResponse(stream_reply(plan.head, plan.body, plan.tail), **SSE_RESPONSE_OPTIONS)
+    return {"reply": plan.head + body_text(plan.body) + plan.tail}
+
+
+@app.post("/chat/batch")
+async def chat_batch(batch: ChatBatch, request: Request, x_gateway_token: str = Header(default="")):
+    """Answer a burst of messages from a gateway in one call (requires CHATBOT_GATEWAY_TOKEN)
     
-    elif intent == 'kagawad_candidates':
-        reply = candidate_manager.format_candidates("Kagawad")
-        reply = add_conversational_flair(reply, intent, language)
-        reply = apply_vibe_to_response(reply, vibe, language)
-        session_manager.update_session(session, user_msg, intent, "Kagawad", language)
-        return {"reply": reply}
+    Each distinct normalized message is classified once per batch. Items are
+    answered in arrival order, so several messages from one user see each
+    other's session updates exactly as separate /chat calls would. A batch
+    counts against the concurrency cap like one /chat request and costs the
+    caller one rate limit token from the same bucket as its /chat calls.
+    """
+    if not token_matches(x_gateway_token, GATEWAY_TOKEN):
+        raise HTTPException(status_code=403, detail="Gateway token required")
+    if len(batch.messages) > CHAT_BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {CHAT_BATCH_MAX_ITEMS} messages per batch")
+    check_rate_limit(get_user_identifier(request))
     
-    elif intent == 'all_candidates':
-        reply = "**Lahat ng Kandidato / All Candidates:**\n\n"
-        for position in ["Barangay Kapitan", "SK Chairman", "Kagawad"]:
-            reply += candidate_manager.format_candidates(position) + "\n\n"
-        reply += "🗳️ Piliin nang mabuti! Choose wisely!"
-        reply = add_conversational_flair(reply, intent, language)
-        reply = apply_vibe_to_response(reply, vibe, language)
-        session_manager.update_session(session, user_msg, intent, language=language)
-        return {"reply": reply.strip()}
+    classifications: Dict[str, Tuple] = {}
+    replies = []
+    for item in batch.messages:
+        user_msg = item.message.strip()
+        if not user_msg:
+            replies.append({"user_id": item.user_id, "reply": EMPTY_MESSAGE_REPLY})
+            continue
+        
+        started = time.perf_counter()
+        timer = metrics.timer()
+        key = normalize_message(user_msg)
+        classification = classifications.get(key)
+        if classification is None:
+            classification = classifications[key] = classify_message(user_msg)
+        
+        # Gateway user ids get their own namespace so they never collide with client IPs
+        session = session_manager.get_session(BATCH_SESSION_PREFIX + item.user_id)
+        plan = reply_parts(user_msg, session, classification, timer)
+        log_reply(session.key, plan, started)
+        replies.append({
+            "user_id": item.user_id,
+            "reply": plan.head + body_text(plan.body) + plan.tail
+        })
     
-    # === CHECK FOR SPECIFIC CANDIDATE ===
-    candidate_info = candidate_manager.get_candidate_info(user_msg)
-    if candidate_info:
-        reply = candidate_info
-        reply = add_conversational_flair(reply, 'candidate_detail', language)
-        reply = apply_vibe_to_response(reply, vibe, language)
-        session_manager.update_session(session, user_msg, 'candidate_detail', language=language)
-        return {"reply": reply}
+    return {"replies": replies}
+
+
+@app.websocket("/ws/chat")
+async def chat_websocket(websocket: WebSocket):
+    """One voter per connection: send {"message": ...}, receive {"reply": ...}
     
-    # === HANDLE GENERAL INTENTS ===
-    reply = generate_reply(intent, language)
-    reply = clean_response(intent, reply)
-    reply = add_conversational_flair(reply, intent, language)
-    reply = apply_vibe_to_response(reply, vibe, language)
-    session_manager.update_session(session, user_msg, intent, language=language)
+    The session is resolved once at connect. Messages are answered one at a
+    time, so a client that floods the socket simply waits (TCP backpressure),
+    and a client that stops reading is dropped after WS_SEND_TIMEOUT_SECONDS.
+    Idle connections close after WS_IDLE_TIMEOUT_SECONDS.
+    """
+    await websocket.accept()
+    session = session_manager.get_session(websocket.client.host)
     
-    return {"reply": reply}
+    try:
+        while True:
+            try:
+                data = await asyncio.wait_for(websocket.receive_json(), WS_IDLE_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1000, reason="Idle timeout")
+                return
+            except (ValueError, KeyError):
+                # Invalid JSON, or a binary frame (receive_json looks up the missing "text" key)
+                await websocket.send_json({"error": WS_USAGE_ERROR})
+                continue
+            
+            user_msg = data.get("message") if isinstance(data, dict) else None
+            if not isinstance(user_msg, str):
+                await websocket.send_json({"error": WS_USAGE_ERROR})
+                continue
+            if len(user_msg) > WS_MAX_MESSAGE_CHARS:
+                await websocket.send_json({"error": f"Message longer than {WS_MAX_MESSAGE_CHARS} characters"})
+                continue
+            
+            user_msg = user_msg.strip()
+            if not user_msg:
+                reply = EMPTY_MESSAGE_REPLY
+            else:
+                retry_after = rate_limiter.acquire(session.key)
+                if retry_after:
+                    await websocket.send_json({"error": RATE_LIMITED_DETAIL, "retry_after": math.ceil(retry_after)})
+                    continue
+                if not concurrency_limiter.try_acquire():
+                    await websocket.send_json({"error": SERVER_BUSY_DETAIL})
+                    continue
+                try:
+                    started = time.perf_counter()
+                    timer = metrics.timer()
+                    session_manager.touch_session(session)
+                    plan = await reply_parts_async(user_msg, session, timer)
+                    log_reply(session.key, plan, started)
+                except ExecutorBusy:
+                    await websocket.send_json({"error": SERVER_BUSY_DETAIL})
+                    continue
+                finally:
+                    concurrency_limiter.release()
+                reply = plan.head + body_text(plan.body) + plan.tail
+            
+            try:
+                await asyncio.wait_for(websocket.send_json({"reply": reply}), WS_SEND_TIMEOUT_SECONDS)
+            except asyncio.TimeoutError:
+                await websocket.close(code=1008, reason="Client is not reading replies")
+                return
+    except WebSocketDisconnect:
+        pass
 
 
-@app.get("/")
-async def root():
-    """Root endpoint"""
+def root_fields() -> Dict:
+    """/ fields (all static)"""
     return {
         "message": "Mayombo AI Assistant is running! / Gumagana ang Mayombo AI Assistant!",
         "status": "online",
@@ -154,9 +357,8 @@ async def root():
     }
 
 
-@app.get("/health")
-async def health():
-    """Health check endpoint"""
+def health_fields() -> Dict:
+    """/health fields; callables are evaluated on every request"""
     stats = candidate_manager.get_stats()
     return {
         "status": "healthy",
@@ -167,13 +369,12 @@ async def health():
         "language_support": ["English", "Tagalog"],
         "vibe_detection": "enabled",
         "conversational_ai": "enabled",
-        "active_sessions": session_manager.get_active_sessions_count()
+        "active_sessions": session_manager.get_active_sessions_count
     }
 
 
-@app.get("/stats")
-async def stats():
-    """Get chatbot statistics"""
+def stats_fields() -> Dict:
+    """/stats fields; callables are evaluated on every request"""
     candidate_stats = candidate_manager.get_stats()
     return {
         "total_candidates": candidate_stats["total"],
@@ -181,10 +382,95 @@ async def stats():
         "supported_languages": ["English", "Tagalog"],
         "vibe_aware": True,
         "context_aware": True,
-        "active_sessions": session_manager.get_active_sessions_count()
+        "active_sessions": session_manager.get_active_sessions_count,
+        "sessions": session_manager.get_eviction_stats,
+        "classification_cache": get_classification_cache_stats,
+        "roster_reload": lambda: candidate_manager.last_reload,  # Also changes on same-file admin reloads
+        "executor": chat_executor.get_stats if chat_executor is not None else {"mode": "inline"},
+        "admission": lambda: {
+            "rate_limit": rate_limiter.get_stats(),
+            "concurrency": concurrency_limiter.get_stats()
+        },
+        "single_flight": chat_single_flight.get_stats,
+        "conversation_log": conversation_log.get_stats
     }
 
 
+# Pre-encoded bodies: roster-derived fields are rebuilt only when the roster reloads
+root_body = PrebuiltJSON(root_fields)
+health_body = PrebuiltJSON(health_fields, lambda: candidate_manager.roster_version)
+stats_body = PrebuiltJSON(stats_fields, lambda: candidate_manager.roster_version)
+
+
+# Added last so it wraps CORSMiddleware: probes skip the whole middleware stack
+app.add_middleware(PrebuiltJSONMiddleware, bodies={"/": root_body, "/health": health_body, "/stats": stats_body})
+
+
+@app.get("/")
+async def root():
+    """Root endpoint"""
+    return Response(root_body.render(), media_type="application/json")
+
+
+@app.get("/health")
+async def health():
+    """Health check endpoint"""
+    return Response(health_body.render(), media_type="application/json")
+
+
+@app.get("/stats")
+async def stats():
+    """Get chatbot statistics"""
+    return Response(stats_body.render(), media_type="application/json")
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Stage latency histograms, request counters and cache gauges (Prometheus text format)"""
+    sessions = session_manager.get_eviction_stats()
+    cache = get_classification_cache_stats()
+    body = metrics.render([
+        ("chatbot_active_sessions", "gauge", "Sessions in the session store", sessions["active"]),
+        ("chatbot_session_capacity", "gauge", "Maximum sessions kept", sessions["max_sessions"]),
+        ("chatbot_sessions_evicted_expired_total", "counter", "Sessions dropped after the idle TTL",
+         sessions["evicted_expired"]),
+        ("chatbot_sessions_evicted_lru_total", "counter", "Sessions dropped by the size cap",
+         sessions["evicted_lru"]),
+        ("chatbot_classification_cache_hits_total", "counter", "Classification cache hits", cache["hits"]),
+        ("chatbot_classification_cache_misses_total", "counter", "Classification cache misses",
+         cache["misses"]),
+        ("chatbot_classification_cache_size", "gauge", "Cached classifications", cache["size"]),
+        ("chatbot_classification_cache_hit_ratio", "gauge", "Classification cache hit rate",
+         cache["hit_rate"]),
+        ("chatbot_rate_limited_total", "counter", "Messages rejected by the per-user rate limit",
+         rate_limiter.rejected),
+        ("chatbot_rate_limit_tracked_users", "gauge", "Users with a partly drained token bucket",
+         len(rate_limiter)),
+        ("chatbot_overload_rejected_total", "counter", "Requests shed by the concurrency limit",
+         concurrency_limiter.rejected),
+        ("chatbot_chat_in_flight", "gauge", "Chat requests being handled", concurrency_limiter.in_flight),
+        ("chatbot_chat_coalesced_total", "counter", "Duplicate /chat requests that shared an in-flight reply",
+         chat_single_flight.coalesced),
+        ("chatbot_chat_replayed_total", "counter", "Retried /chat requests answered with a just-finished reply",
+         chat_single_flight.replayed),
+        ("chatbot_conversation_log_pending", "gauge", "Conversation log entries waiting to be written",
+         conversation_log.pending),
+        ("chatbot_conversation_log_dropped_total", "counter", "Conversation log entries dropped (buffer full)",
+         conversation_log.dropped),
+        ("chatbot_candidates_loaded", "gauge", "Candidates in the current roster",
+         candidate_manager.get_total_candidates()),
+    ])
+    return PlainTextResponse(body, media_type="text/plain; version=0.0.4")
+
+
+@app.post("/admin/reload-candidates")
+async def reload_candidates(x_admin_token: str = Header(default="")):
+    """Reload candidates.csv without restarting (requires CHATBOT_ADMIN_TOKEN)"""
+    if not token_matches(x_admin_token, ADMIN_TOKEN):
+        raise HTTPException(status_code=403, detail="Admin token required")
+    return await candidate_manager.reload_candidates()
+
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run(app, host="0.0.0.0", port=8000)
@@ -0,0 +1,140 @@
+"""Low-overhead request metrics with Prometheus text exposition"""
+
+import time
+from bisect import bisect_left
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from config import METRICS_ENABLED, METRICS_LATENCY_BUCKETS
+
+# Pipeline stages of /chat, in execution order ("offload" replaces the first
+# three, plus queueing, when replies are composed in a worker pool)
+CHAT_STAGES = ("classify", "candidate_lookup", "response", "offload", "session_update")
+
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is one bisect and two additions"""
+
+    __slots__ = ("bounds", "counts", "sum")
+
+    def __init__(self, bounds: Iterable[float] = METRICS_LATENCY_BUCKETS):
+        self.bounds = tuple(sorted(bounds))
+        self.counts = [0] * (len(self.bounds) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.bounds, value)] += 1
+        self.sum += value
+
+    @property
+    def count(self) -> int:
+        return sum(self.counts)
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le label, cumulative count) pairs as Prometheus expects them"""
+        pairs = []
+        running = 0
+        for bound, count in zip(self.bounds, self.counts):
+            running += count
+            pairs.append((_format_value(bound), running))
+        pairs.append(("+Inf", running + self.counts[-1]))
+        return pairs
+
+
+class StageTimer:
+    """Times consecutive pipeline stages of one request"""
+
+    __slots__ = ("_metrics", "_started", "_last")
+
+    def __init__(self, metrics: "Metrics"):
+        self._metrics = metrics
+        self._started = self._last = time.perf_counter()
+
+    def lap(self, stage: str):
+        """Record the time since the previous lap (or start) under `stage`"""
+        now = time.perf_counter()
+        self._metrics.stage_seconds[stage].observe(now - self._last)
+        self._last = now
+
+    def finish(self, intent: str, language: str):
+        """Record the whole request and count it by intent and language"""
+        metrics = self._metrics
+        metrics.request_seconds.observe(time.perf_counter() - self._started)
+        key = (intent, language)
+        metrics.requests[key] = metrics.requests.get(key, 0) + 1
+
+
+class _NullTimer:
+    """Stand-in used when metrics are disabled; every call is a no-op"""
+
+    __slots__ = ()
+
+    def lap(self, stage: str):
+        pass
+
+    def finish(self, intent: str, language: str):
+        pass
+
+
+NULL_TIMER = _NullTimer()
+
+
+class Metrics:
+    """Per-process /chat latency histograms and request counters"""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED, stages: Iterable[str] = CHAT_STAGES,
+                 buckets: Iterable[float] = METRICS_LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self.stage_seconds: Dict[str, Histogram] = {stage: Histogram(self.buckets) for stage in stages}
+        self.request_seconds = Histogram(self.buckets)
+        self.requests: Dict[Tuple[str, str], int] = {}
+
+    def timer(self):
+        """Start timing a request (a shared no-op timer when disabled)"""
+        return StageTimer(self) if self.enabled else NULL_TIMER
+
+    def render(self, gauges: Optional[List[Tuple[str, str, str, float]]] = None) -> str:
+        """Prometheus text format; gauges are extra (name, type, help, value) samples"""
+        lines = [
+            "# HELP chatbot_chat_stage_seconds Time spent in each /chat pipeline stage",
+            "# TYPE chatbot_chat_stage_seconds histogram",
+        ]
+        for stage, histogram in self.stage_seconds.items():
+            lines.extend(_histogram_lines("chatbot_chat_stage_seconds", f'stage="{stage}"', histogram))
+
+        lines.append("# HELP chatbot_chat_request_seconds Total /chat handling time")
+        lines.append("# TYPE chatbot_chat_request_seconds histogram")
+        lines.extend(_histogram_lines("chatbot_chat_request_seconds", "", self.request_seconds))
+
+        lines.append("# HELP chatbot_chat_requests_total /chat requests by reply intent and language")
+        lines.append("# TYPE chatbot_chat_requests_total counter")
+        for (intent, language), count in sorted(self.requests.items()):
+            lines.append(f'chatbot_chat_requests_total{{intent="{intent}",language="{language}"}} {count}')
+
+        lines.append("# HELP chatbot_metrics_enabled Whether /chat stage timing is switched on")
+        lines.append("# TYPE chatbot_metrics_enabled gauge")
+        lines.append(f"chatbot_metrics_enabled {int(self.enabled)}")
+
+        for name, kind, help_text, value in gauges or ():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            lines.append(f"{name} {_format_value(value)}")
+
+        return "\n".join(lines) + "\n"
+
+
+def _format_value(value: float) -> str:
+    """Integers without a trailing .0, floats with repr precision"""
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _histogram_lines(name: str, labels: str, histogram: Histogram) -> List[str]:
+    """_bucket/_sum/_count sample lines for one labelled histogram"""
+    prefix = f"{labels}," if labels else ""
+    suffix = f"{{{labels}}}" if labels else ""
+    lines = [f'{name}_bucket{{{prefix}le="{le}"}} {count}' for le, count in histogram.cumulative()]
+    lines.append(f"{name}_sum{suffix} {_format_value(histogram.sum)}")
+    lines.append(f"{name}_count{suffix} {histogram.count}")
+    return lines
@@ -0,0 +1,286 @@
+#!/usr/bin/env python3
+"""
+Optional hashed character n-gram classifier for language and vibe
+
+A small softmax model per task (language, vibe) over hashed character
+n-gram counts, trained from vibe_dataset_english.csv and
+vibe_dataset_tagalog.csv (language labels come from which file a row is in).
+Enable it with CHATBOT_CLASSIFIER=ngram; NumPy is required only then.
+
+    python ngram_classifier.py            # k-fold accuracy and latency vs keyword detection
+
+Weights are cached in NGRAM_WEIGHTS_PATH and retrained whenever the
+datasets or hyperparameters change.
+"""
+
+import csv
+import hashlib
+import json
+import sys
+import time
+import zlib
+from collections import Counter
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+try:
+    import numpy as np
+except ImportError:  # Optional dependency: keyword detection is used instead
+    np = None
+
+from config import (
+    NGRAM_DATASETS, NGRAM_WEIGHTS_PATH, NGRAM_FEATURES, NGRAM_MIN_N, NGRAM_MAX_N,
+    NGRAM_EPOCHS, NGRAM_LEARNING_RATE, NGRAM_L2
+)
+
+TASKS = ("language", "vibe")
+
+
+def ngram_hashes(message: str, min_n: int = NGRAM_MIN_N, max_n: int = NGRAM_MAX_N,
+                 n_features: int = NGRAM_FEATURES) -> List[int]:
+    """Feature ids of every character n-gram of the space-padded, normalized message"""
+    padded = f" {' '.join(message.lower().split())} ".encode("utf-8")
+    return [
+        zlib.crc32(padded[i:i + n]) % n_features  # crc32 is stable across processes, unlike hash()
+        for n in range(min_n, max_n + 1)
+        for i in range(len(padded) - n + 1)
+    ]
+
+
+class Features(NamedTuple):
+    """L2-normalized hashed n-gram counts in sparse row form (CSR without the matrix)
+
+    Message i's nonzero features are ids[starts[i]:starts[i + 1]] with weights
+    values[...]; rows holds each entry's message index. Memory grows with the
+    total message length, not with len(messages) * n_features.
+    """
+    ids: "np.ndarray"
+    values: "np.ndarray"
+    rows: "np.ndarray"
+    starts: "np.ndarray"
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+
+def featurize(messages: Sequence[str], n_features: int = NGRAM_FEATURES) -> Features:
+    """L2-normalized hashed n-gram counts, one sparse row per message"""
+    ids = []
+    counts = []
+    lengths = []
+    for message in messages:
+        # Padding gives every message at least one n-gram, so no row is empty
+        message_counts = Counter(ngram_hashes(message, n_features=n_features))
+        ids.extend(message_counts)
+        counts.extend(message_counts.values())
+        lengths.append(len(message_counts))
+
+    lengths = np.asarray(lengths, dtype=np.int64)
+    rows = np.repeat(np.arange(len(lengths)), lengths)
+    counts = np.asarray(counts, dtype=np.float32)
+    norms = np.sqrt(np.bincount(rows, weights=counts * counts, minlength=len(lengths))).astype(np.float32)
+    return Features(np.asarray(ids, dtype=np.int64), counts / norms[rows], rows, np.cumsum(lengths) - lengths)
+
+
+def linear_scores(features: Features, weights: "np.ndarray", bias: "np.ndarray") -> "np.ndarray":
+    """features @ weights + bias, gathering only the weight rows that occur"""
+    return np.add.reduceat(weights[features.ids] * features.values[:, None], features.starts, axis=0) + bias
+
+
+def train_softmax(features: Features, targets: "np.ndarray", n_classes: int, n_features: int = NGRAM_FEATURES,
+                  epochs: int = NGRAM_EPOCHS, learning_rate: float = NGRAM_LEARNING_RATE,
+                  l2: float = NGRAM_L2) -> Tuple["np.ndarray", "np.ndarray"]:
+    """Full-batch gradient descent on L2-regularized softmax cross-entropy"""
+    n_samples = len(features)
+    weights = np.zeros((n_features, n_classes), dtype=np.float32)
+    bias = np.zeros(n_classes, dtype=np.float32)
+    one_hot = np.eye(n_classes, dtype=np.float32)[targets]
+
+    for _ in range(epochs):
+        logits = linear_scores(features, weights, bias)
+        logits -= logits.max(axis=1, keepdims=True)
+        probs = np.exp(logits)
+        probs /= probs.sum(axis=1, keepdims=True)
+        error = (probs - one_hot) / n_samples
+        # features.T @ error, one bincount over the nonzero entries per class
+        contributions = features.values[:, None] * error[features.rows]
+        gradient = np.stack([
+            np.bincount(features.ids, weights=contributions[:, c], minlength=n_features) for c in range(n_classes)
+        ], axis=1).astype(np.float32)
+        weights -= learning_rate * (gradient + l2 * weights)
+        bias -= learning_rate * error.sum(axis=0)
+
+    return weights, bias
+
+
+def load_training_data(datasets: Dict[str, str] = NGRAM_DATASETS) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Messages plus per-task labels from the vibe CSVs (language -> path)"""
+    texts = []
+    labels = {task: [] for task in TASKS}
+    for language, path in datasets.items():
+        with open(path, "r", encoding="utf-8") as f:
+            for row in csv.DictReader(f):
+                text = (row.get("text") or "").strip()
+                vibe = (row.get("label") or "").strip()
+                if text and vibe:
+                    texts.append(text)
+                    labels["language"].append(language)
+                    labels["vibe"].append(vibe)
+    return texts, labels
+
+
+class NgramClassifier:
+    """Language and vibe softmax heads scored from one set of hashed features"""
+
+    def __init__(self, heads: Dict[str, Tuple[Tuple[str, ...], "np.ndarray", "np.ndarray"]],
+                 n_features: int = NGRAM_FEATURES):
+        self.heads = heads  # task -> (labels, weights, bias)
+        self.n_features = n_features
+
+    @classmethod
+    def train(cls, texts: Sequence[str], labels: Dict[str, Sequence[str]],
+              n_features: int = NGRAM_FEATURES) -> "NgramClassifier":
+        features = featurize(texts, n_features)
+        heads = {}
+        for task in TASKS:
+            classes = tuple(sorted(set(labels[task])))
+            targets = np.asarray([classes.index(label) for label in labels[task]])
+            weights, bias = train_softmax(features, targets, len(classes), n_features)
+            heads[task] = (classes, weights, bias)
+        return cls(heads, n_features)
+
+    def predict_batch(self, messages: Sequence[str]) -> Dict[str, List[str]]:
+        """Score a whole batch with one sparse product per task"""
+        if not messages:
+            return {task: [] for task in self.heads}
+        features = featurize(messages, self.n_features)
+        return {
+            task: [classes[i] for i in np.argmax(linear_scores(features, weights, bias), axis=1)]
+            for task, (classes, weights, bias) in self.heads.items()
+        }
+
+    def classify_batch(self, messages: Sequence[str]) -> List[Tuple[str, str]]:
+        """(language, vibe) per message"""
+        predicted = self.predict_batch(messages)
+        return list(zip(predicted["language"], predicted["vibe"]))
+
+    def classify(self, message: str) -> Tuple[str, str]:
+        """(language, vibe) for one message"""
+        return self.classify_batch([message])[0]
+
+    def save(self, path: str, fingerprint: str):
+        arrays = {}
+        for task, (classes, weights, bias) in self.heads.items():
+            arrays[f"{task}_weights"] = weights
+            arrays[f"{task}_bias"] = bias
+        meta = {"fingerprint": fingerprint, "classes": {task: list(h[0]) for task, h in self.heads.items()}}
+        with open(path, "wb") as f:
+            np.savez(f, meta=np.asarray(json.dumps(meta)), **arrays)
+
+    @classmethod
+    def load(cls, path: str, fingerprint: str) -> Optional["NgramClassifier"]:
+        """Cached weights, or None if missing or trained from other data/settings"""
+        try:
+            with np.load(path) as data:
+                meta = json.loads(str(data["meta"]))
+                if meta["fingerprint"] != fingerprint:
+                    return None
+                heads = {
+                    task: (tuple(classes), data[f"{task}_weights"], data[f"{task}_bias"])
+                    for task, classes in meta["classes"].items()
+                }
+        except (OSError, KeyError, ValueError):
+            return None
+        return cls(heads)
+
+
+def training_fingerprint(datasets: Dict[str, str] = NGRAM_DATASETS) -> str:
+    """Hash of the dataset contents and every hyperparameter"""
+    digest = hashlib.sha1(json.dumps(
+        [NGRAM_FEATURES, NGRAM_MIN_N, NGRAM_MAX_N, NGRAM_EPOCHS, NGRAM_LEARNING_RATE, NGRAM_L2]
+    ).encode("utf-8"))
+    for language, path in sorted(datasets.items()):
+        digest.update(language.encode("utf-8"))
+        with open(path, "rb") as f:
+            digest.update(f.read())
+    return digest.hexdigest()
+
+
+def load_or_train(weights_path: str = NGRAM_WEIGHTS_PATH,
+                  datasets: Dict[str, str] = NGRAM_DATASETS) -> Optional[NgramClassifier]:
+    """Load cached weights or train (and cache) a new model; None without NumPy"""
+    if np is None:
+        print("[ERROR] CHATBOT_CLASSIFIER=ngram needs numpy; using keyword detection")
+        return None
+
+    fingerprint = training_fingerprint(datasets)
+    model = NgramClassifier.load(weights_path, fingerprint)
+    if model is not None:
+        return model
+
+    started = time.perf_counter()
+    texts, labels = load_training_data(datasets)
+    model = NgramClassifier.train(texts, labels)
+    try:
+        model.save(weights_path, fingerprint)
+    except OSError as e:
+        print(f"[ERROR] Could not cache n-gram weights: {e}")
+    print(f"[OK] Trained n-gram classifier on {len(texts)} messages in {time.perf_counter() - started:.2f}s")
+    return model
+
+
+def evaluate(folds: int = 5, seed: int = 7):
+    """k-fold accuracy of the n-gram model vs the keyword detectors, plus latency"""
+    from nlp_utils import detect_language, detect_vibe
+    from bench_corpus import ALL_MESSAGES
+
+    texts, labels = load_training_data()
+    order = np.random.default_rng(seed).permutation(len(texts))
+    predicted = {task: [None] * len(texts) for task in TASKS}
+    for fold in range(folds):
+        test = order[fold::folds]
+        train = np.setdiff1d(order, test)
+        model = NgramClassifier.train([texts[i] for i in train],
+                                      {task: [labels[task][i] for i in train] for task in TASKS})
+        fold_predictions = model.predict_batch([texts[i] for i in test])
+        for task in TASKS:
+            for i, label in zip(test, fold_predictions[task]):
+                predicted[task][i] = label
+
+    keyword_language = [detect_language(t) for t in texts]
+    keyword_vibe = [detect_vibe(t, language) for t, language in zip(texts, keyword_language)]
+
+    def accuracy(guesses, truth):
+        return sum(g == t for g, t in zip(guesses, truth)) / len(truth)
+
+    print("=" * 60)
+    print(f"🎯 ACCURACY ({folds}-fold for n-gram, {len(texts)} labelled messages)")
+    print("=" * 60)
+    print(f"{'task':<12} {'keywords':>10} {'n-gram':>10}")
+    print(f"{'language':<12} {accuracy(keyword_language, labels['language']):>10.1%} "
+          f"{accuracy(predicted['language'], labels['language']):>10.1%}")
+    print(f"{'vibe':<12} {accuracy(keyword_vibe, labels['vibe']):>10.1%} "
+          f"{accuracy(predicted['vibe'], labels['vibe']):>10.1%}")
+
+    import timeit
+    model = NgramClassifier.train(texts, labels)
+    messages = list(ALL_MESSAGES)
+    single = min(timeit.repeat(lambda: [model.classify(m) for m in messages], number=20, repeat=5))
+    batch = min(timeit.repeat(lambda: model.classify_batch(messages), number=20, repeat=5))
+    keywords = min(timeit.repeat(
+        lambda: [detect_vibe(m, detect_language(m)) for m in messages], number=20, repeat=5
+    ))
+    per_message = 20 * len(messages) / 1e6
+
+    print("\n" + "=" * 60)
+    print("⏱️  LATENCY (µs per message)")
+    print("=" * 60)
+    print(f"{'keywords (detect_language + detect_vibe)':.<45} {keywords / per_message:>10.2f}")
+    print(f"{'n-gram, one message per call':.<45} {single / per_message:>10.2f}")
+    print(f"{'n-gram, whole batch in one call':.<45} {batch / per_message:>10.2f}")
+
+
+if __name__ == "__main__":
+    if np is None:
+        print("[ERROR] numpy is required: pip install numpy")
+        sys.exit(2)
+    evaluate()
@@ -2,57 +2,112 @@
 
 import re
 import random
-from typing import Tuple, Optional
-from config import INTENT_PATTERNS, VIBE_KEYWORDS, CONVERSATIONAL_STARTERS, FOLLOW_UP_SUGGESTIONS
+from functools import lru_cache
+from typing import Dict, Tuple, Optional
+from config import (
+    INTENT_PATTERNS, VIBE_KEYWORDS, CONVERSATIONAL_STARTERS, FOLLOW_UP_SUGGESTIONS,
+    CLASSIFICATION_CACHE_SIZE, CLASSIFICATION_CACHE_MAX_CHARS, CLASSIFIER_MODE
+)
+from session_manager import Session
+from text_matcher import KeywordAutomaton
+
+
+def _compile_intent_patterns(flags: int = 0) -> Tuple[Tuple[re.Pattern, str, float], ...]:
+    """Compile INTENT_PATTERNS once, best score first so the first hit wins"""
+    # sorted() is stable, so equal scores keep config order (same tie-break as before)
+    ordered = sorted(INTENT_PATTERNS, key=lambda entry: -entry[2])
+    return tuple(
+        (re.compile(pattern, flags), intent, base_score)
+        for pattern, intent, base_score in ordered
+        if base_score > 0.0
+    )
+
+
+def _compile_any_intent(flags: int = 0) -> re.Pattern:
+    """Single alternation of every intent pattern, used to reject non-matches in one scan"""
+    return re.compile("|".join(f"(?:{pattern})" for pattern, _, _ in INTENT_PATTERNS), flags)
+
+
+# Patterns are all lowercase, so IGNORECASE only matters for non-ASCII input
+# (e.g. 'ſ' or 'ı' folding onto ASCII letters). ASCII messages use the cheaper
+# case-sensitive matchers; everything else keeps the original flags.
+_INTENT_MATCHERS = _compile_intent_patterns()
+_INTENT_MATCHERS_IGNORECASE = _compile_intent_patterns(re.IGNORECASE)
+_ANY_INTENT = _compile_any_intent()
+_ANY_INTENT_IGNORECASE = _compile_any_intent(re.IGNORECASE)
 
 
 def detect_intent(message: str) -> Tuple[str, float]:
     """Detect user intent using pattern matching"""
     message = message.lower().strip()
     
-    best_intent = 'unknown'
-    best_score = 0.0
+    if message.isascii():
+        any_intent, matchers = _ANY_INTENT, _INTENT_MATCHERS
+    else:
+        any_intent, matchers = _ANY_INTENT_IGNORECASE, _INTENT_MATCHERS_IGNORECASE
+    
+    if not any_intent.search(message):
+        return 'unknown', 0.0
     
-    for pattern, intent, base_score in INTENT_PATTERNS:
-        if re.search(pattern, message, re.IGNORECASE):
-            if base_score > best_score:
-                best_score = base_score
-                best_intent = intent
+    for regex, intent, base_score in matchers:
+        if regex.search(message):
+            return intent, base_score
     
-    return best_intent, best_score
+    return 'unknown', 0.0
 
 
-def detect_vibe(message: str, language: str) -> str:
-    """Lightweight vibe detection using keywords"""
-    msg_lower = message.lower()
-    lang_kw = VIBE_KEYWORDS.get(language, VIBE_KEYWORDS["english"])
-    
-    for kw in lang_kw["negative"]:
-        if kw in msg_lower:
-            return "negative"
-    
-    for kw in lang_kw["positive"]:
-        if kw in msg_lower:
-            return "positive"
-    
-    return "neutral"
+# Keyword lists scored by detect_language (substring tests on the lowercased message)
+ENGLISH_INDICATORS = ['thank', 'thanks', 'you ', 'your ', 'how to', 'can i', 'what is', 'where ', 'when ', 'who ', 'vote', 'candidates', 'eligible', 'register']
+TAGALOG_INDICATORS = ['ang ', 'ng ', 'sa ', 'mga ', 'ko ', 'mo ', 'ano ', 'sino ', 'paano ', 'salamat', 'boto', 'kandidato', 'bumoto', 'pagboto']
+TAGLISH_PATTERNS = ['paano mag', 'paano bumoto', 'ano ang kailangan', 'pwede ko', 'pwede ba', 'mag vote', 'mag-vote', 'how bumoto', 'eligible ba', 'ano eligibility']
 
 
-def detect_language(message: str) -> str:
-    """Improved language detection (English vs Tagalog vs Taglish - mixed language)"""
-    msg_lower = message.lower().strip()
+def _build_signal_scanner() -> Tuple[KeywordAutomaton, Dict[str, int], Dict[str, Tuple[int, int]]]:
+    """One automaton over every language indicator and vibe keyword
     
-    # Strong English indicators (prioritize these)
-    english_indicators = ['thank', 'thanks', 'you ', 'your ', 'how to', 'can i', 'what is', 'where ', 'when ', 'who ', 'vote', 'candidates', 'eligible', 'register']
-    english_score = sum(1 for word in english_indicators if word in msg_lower)
+    Each keyword maps to a bitmask of the lists it belongs to, so a single
+    pass tells which lists matched and how many distinct keywords each had.
+    """
+    lists = [("english", ENGLISH_INDICATORS), ("tagalog", TAGALOG_INDICATORS), ("taglish", TAGLISH_PATTERNS)]
+    vibe_bits = {}
+    for language, moods in VIBE_KEYWORDS.items():
+        vibe_bits[language] = (1 << len(lists), 1 << (len(lists) + 1))
+        lists.append((f"{language}_negative", moods["negative"]))
+        lists.append((f"{language}_positive", moods["positive"]))
     
-    # Strong Tagalog indicators
-    tagalog_indicators = ['ang ', 'ng ', 'sa ', 'mga ', 'ko ', 'mo ', 'ano ', 'sino ', 'paano ', 'salamat', 'boto', 'kandidato', 'bumoto', 'pagboto']
-    tagalog_score = sum(1 for word in tagalog_indicators if word in msg_lower)
+    masks: Dict[str, int] = {}
+    for bit, (_, keywords) in enumerate(lists):
+        for keyword in keywords:
+            masks[keyword] = masks.get(keyword, 0) | (1 << bit)
     
-    # Taglish indicators (mixed English-Tagalog patterns) - CRITICAL for better detection
-    taglish_patterns = ['paano mag', 'paano bumoto', 'ano ang kailangan', 'pwede ko', 'pwede ba', 'mag vote', 'mag-vote', 'how bumoto', 'eligible ba', 'ano eligibility']
-    taglish_score = sum(1 for pattern in taglish_patterns if pattern in msg_lower)
+    bits = {name: 1 << bit for bit, (name, _) in enumerate(lists)}
+    scanner = KeywordAutomaton((keyword, (keyword, mask)) for keyword, mask in masks.items())
+    return scanner, bits, vibe_bits
+
+
+_SIGNAL_SCANNER, _SIGNAL_BITS, _VIBE_BITS = _build_signal_scanner()
+_ENGLISH_BIT = _SIGNAL_BITS["english"]
+_TAGALOG_BIT = _SIGNAL_BITS["tagalog"]
+_TAGLISH_BIT = _SIGNAL_BITS["taglish"]
+
+
+def _scan_signals(msg_lower: str) -> Tuple[int, int, int, int]:
+    """(english, tagalog, taglish) distinct-keyword scores plus the union of all masks"""
+    english_score = tagalog_score = taglish_score = combined = 0
+    for _, mask in _SIGNAL_SCANNER.matched_values(msg_lower):
+        if mask & _ENGLISH_BIT:
+            english_score += 1
+        if mask & _TAGALOG_BIT:
+            tagalog_score += 1
+        if mask & _TAGLISH_BIT:
+            taglish_score += 1
+        combined |= mask
+    return english_score, tagalog_score, taglish_score, combined
+
+
+def _language_from_signals(signals: Tuple[int, int, int, int]) -> str:
+    """Apply detect_language's decision rules to scanned scores"""
+    english_score, tagalog_score, taglish_score, _ = signals
     
     # Decision logic: Taglish gets priority for proper response
     if taglish_score > 0:
@@ -65,14 +120,98 @@ def detect_language(message: str) -> str:
         return 'english'
 
 
-def apply_vibe_to_response(reply: str, vibe: str, language: str) -> str:
-    """Add vibe-appropriate touches WITHOUT changing factual content"""
+def _vibe_from_signals(signals: Tuple[int, int, int, int], language: str) -> str:
+    """Negative keywords win over positive ones, as in detect_vibe"""
+    negative_bit, positive_bit = _VIBE_BITS.get(language, _VIBE_BITS["english"])
+    combined = signals[3]
+    
+    if combined & negative_bit:
+        return "negative"
+    if combined & positive_bit:
+        return "positive"
+    return "neutral"
+
+
+def detect_vibe(message: str, language: str) -> str:
+    """Lightweight vibe detection using keywords"""
+    return _vibe_from_signals(_scan_signals(message.lower()), language)
+
+
+def detect_language(message: str) -> str:
+    """Improved language detection (English vs Tagalog vs Taglish - mixed language)"""
+    return _language_from_signals(_scan_signals(message.lower().strip()))
+
+
+def detect_language_and_vibe(message: str) -> Tuple[str, str]:
+    """detect_language and detect_vibe from a single scan of the message"""
+    signals = _scan_signals(message.lower().strip())
+    language = _language_from_signals(signals)
+    return language, _vibe_from_signals(signals, language)
+
+
+def normalize_message(message: str) -> str:
+    """Lowercase and collapse whitespace so repeated phrasings share one cache key"""
+    return " ".join(message.lower().split())
+
+
+def _load_ngram_classifier():
+    """The optional n-gram model when CLASSIFIER_MODE asks for it (None otherwise)"""
+    if CLASSIFIER_MODE != "ngram":
+        return None
+    from ngram_classifier import load_or_train
+    return load_or_train()
+
+
+_NGRAM_CLASSIFIER = _load_ngram_classifier()
+
+
+def _classify_uncached(message: str) -> Tuple[str, float, str, str]:
+    """Run intent, language and vibe detection on an already-normalized message"""
+    intent, confidence = detect_intent(message)
+    if _NGRAM_CLASSIFIER is not None:
+        language, vibe = _NGRAM_CLASSIFIER.classify(message)
+    else:
+        language, vibe = detect_language_and_vibe(message)
+    return intent, confidence, language, vibe
+
+
+_classify_normalized = lru_cache(maxsize=CLASSIFICATION_CACHE_SIZE)(_classify_uncached)
+
+
+def classify_message(message: str) -> Tuple[str, float, str, str]:
+    """Classify a message as (intent, confidence, language, vibe), LRU-cached
+    
+    The cache is bounded by entry count, so only messages up to
+    CLASSIFICATION_CACHE_MAX_CHARS are cached; long ones are one-offs anyway.
+    """
+    normalized = normalize_message(message)
+    if len(normalized) > CLASSIFICATION_CACHE_MAX_CHARS:
+        return _classify_uncached(normalized)
+    return _classify_normalized(normalized)
+
+
+def get_classification_cache_stats() -> Dict:
+    """Get hit/miss counters of the classification cache"""
+    info = _classify_normalized.cache_info()
+    lookups = info.hits + info.misses
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "max_size": info.maxsize,
+        "max_message_chars": CLASSIFICATION_CACHE_MAX_CHARS,
+        "hit_rate": round(info.hits / lookups, 4) if lookups else 0.0
+    }
+
+
+def vibe_wrapping(vibe: str, language: str) -> Tuple[str, str]:
+    """Prefix and suffix that apply_vibe_to_response puts around a reply"""
     if vibe == "positive":
         closings = {
             "english": "\n\n✨ Happy to help! Your vote matters! 🗳️",
             "tagalog": "\n\n✨ Masaya kaming makatulong! Mahalaga ang boto mo! 🗳️"
         }
-        return reply + closings.get(language, closings["english"])
+        return "", closings.get(language, closings["english"])
     
     elif vibe == "negative":
         empathy = {
@@ -83,38 +222,65 @@ def apply_vibe_to_response(reply: str, vibe: str, language: str) -> str:
             "english": "\n\n📞 Need help? Type 'help' for assistance!",
             "tagalog": "\n\n📞 Kailangan ng tulong? I-type ang 'help'!"
         }
-        return empathy.get(language, empathy["english"]) + reply + help_offer.get(language, help_offer["english"])
+        return empathy.get(language, empathy["english"]), help_offer.get(language, help_offer["english"])
     
-    return reply
+    return "", ""
 
 
-def clean_response(intent: str, text: str) -> str:
-    """Remove headers that repeat the user's question"""
-    INTENT_HEADERS = {
-        "voting_process": ["paano bumoto", "how to vote", "voting process", "hakbang sa pagboto"],
-        "eligibility": ["kinakailangan para bumoto", "voter eligibility"],
-        "registration": ["paano magparehistro", "how to register"]
+def apply_vibe_to_response(reply: str, vibe: str, language: str) -> str:
+    """Add vibe-appropriate touches WITHOUT changing factual content"""
+    prefix, suffix = vibe_wrapping(vibe, language)
+    return prefix + reply + suffix
+
+
+# Headers that repeat the user's question, removed from replies by clean_response
+INTENT_HEADERS = {
+    "voting_process": ["paano bumoto", "how to vote", "voting process", "hakbang sa pagboto"],
+    "eligibility": ["kinakailangan para bumoto", "voter eligibility"],
+    "registration": ["paano magparehistro", "how to register"]
+}
+
+
+def _compile_header_patterns() -> Dict[str, Tuple[Tuple[re.Pattern, re.Pattern], ...]]:
+    """Compile the bold-header and "...:" line patterns for every header once"""
+    return {
+        intent: tuple(
+            (re.compile(rf"\*\*.*{header}.*?\*\*\s*", re.IGNORECASE),
+             re.compile(rf".*{header}.*:\s*", re.IGNORECASE))
+            for header in headers
+        )
+        for intent, headers in INTENT_HEADERS.items()
     }
 
-    if intent in INTENT_HEADERS:
-        for header in INTENT_HEADERS[intent]:
-            text = re.sub(rf"\*\*.*{header}.*?\*\*\s*", "", text, flags=re.IGNORECASE)
-            text = re.sub(rf".*{header}.*:\s*", "", text, flags=re.IGNORECASE)
 
+_HEADER_PATTERNS = _compile_header_patterns()
+
+
+def clean_response(intent: str, text: str) -> str:
+    """Remove headers that repeat the user's question
+    
+    Replies come from templates, which are cleaned once at import
+    (responses.CLEANED_TEMPLATES) with these precompiled patterns.
+    """
+    for bold_header, header_line in _HEADER_PATTERNS.get(intent, ()):
+        text = bold_header.sub("", text)
+        text = header_line.sub("", text)
+    
     return text.strip()
 
 
-def add_conversational_flair(reply: str, intent: str, language: str) -> str:
-    """Add natural conversation flow (simulates ML personality)"""
+def conversational_flair(intent: str, language: str) -> Tuple[str, str]:
+    """Starter and closing that add_conversational_flair puts around a reply"""
+    starter = ""
+    closing = ""
+    
     # Add starter phrase for non-greeting intents
     if intent not in ['greeting', 'thanks', 'goodbye', 'unknown']:
         starter = random.choice(CONVERSATIONAL_STARTERS.get(language, CONVERSATIONAL_STARTERS["english"]))
-        reply = starter + reply
     
     # Add follow-up suggestion for key intents
     if intent in FOLLOW_UP_SUGGESTIONS:
-        suggestion = FOLLOW_UP_SUGGESTIONS[intent].get(language, FOLLOW_UP_SUGGESTIONS[intent]["english"])
-        reply += suggestion
+        closing = FOLLOW_UP_SUGGESTIONS[intent].get(language, FOLLOW_UP_SUGGESTIONS[intent]["english"])
     
     # Special handling for greetings
     elif intent == 'greeting':
@@ -125,15 +291,20 @@ def add_conversational_flair(reply: str, intent: str, language: str) -> str:
             "\n\nReady to make your voice heard? 💬",
             "\n\nI'm here to help with anything election-related!"
         ])
-        reply += closing
     
-    return reply
+    return starter, closing
+
+
+def add_conversational_flair(reply: str, intent: str, language: str) -> str:
+    """Add natural conversation flow (simulates ML personality)"""
+    starter, closing = conversational_flair(intent, language)
+    return starter + reply + closing
 
 
-def apply_conversational_logic(user_msg: str, intent: str, lang: str, session: dict) -> str:
+def apply_conversational_logic(user_msg: str, intent: str, lang: str, session: Session) -> str:
     """Handle conversational follow-ups and context"""
     if intent == 'unknown':
-        last_intent = session.get("last_intent")
+        last_intent = session.last_intent
         
         # Handle "and for SK?" type follow-ups
         if last_intent in ['kapitan_candidates', 'kagawad_candidates'] and re.search(r'\b(sk|sangguniang kabataan)\b', user_msg, re.IGNORECASE):
@@ -0,0 +1,88 @@
+"""JSON response bodies whose static fields are encoded once"""
+
+import json
+from typing import Any, Callable, Dict, Hashable, List, Optional, Union
+
+
+def encode_json(value: Any) -> bytes:
+    """Encode exactly as FastAPI's JSONResponse does"""
+    return json.dumps(value, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+class PrebuiltJSON:
+    """A JSON object body kept as pre-encoded bytes plus a few live fields
+
+    build() returns the object's fields in order. Callable values are dynamic:
+    they are called and encoded on every render(). Everything else is encoded
+    when the body is built, and consecutive static fields become a single
+    bytes chunk. The body is rebuilt whenever version() returns a new value
+    (e.g. the roster version), so a render with no dynamic fields is just a
+    version check.
+    """
+
+    def __init__(self, build: Callable[[], Dict[str, Any]],
+                 version: Callable[[], Hashable] = lambda: None):
+        self._build = build
+        self._version = version
+        self._parts: Optional[List[Union[bytes, Callable[[], Any]]]] = None
+        self._built_for: Hashable = None
+        self.builds = 0
+
+    def _compile(self, fields: Dict[str, Any]) -> List[Union[bytes, Callable[[], Any]]]:
+        parts = []
+        static = b"{"
+        for index, (key, value) in enumerate(fields.items()):
+            static += (b"," if index else b"") + encode_json(key) + b":"
+            if callable(value):
+                parts.append(static)
+                parts.append(value)
+                static = b""
+            else:
+                static += encode_json(value)
+        parts.append(static + b"}")
+        return parts
+
+    def render(self) -> bytes:
+        """Current body: rebuilt if the version changed, live fields encoded now"""
+        version = self._version()
+        if self._parts is None or version != self._built_for:
+            self._parts = self._compile(self._build())
+            self._built_for = version
+            self.builds += 1
+        parts = self._parts
+        if len(parts) == 1:
+            return parts[0]
+        return b"".join(part if isinstance(part, bytes) else encode_json(part()) for part in parts)
+
+
+class PrebuiltJSONMiddleware:
+    """Answer GETs for prebuilt bodies before routing, validation and CORS
+
+    Requests carrying an Origin header fall through to the app so CORS
+    headers are still added for browsers; the matching routes serve the same
+    bodies. Load balancer probes never send one.
+    """
+
+    def __init__(self, app, bodies: Dict[str, PrebuiltJSON]):
+        self.app = app
+        self.bodies = bodies
+
+    async def __call__(self, scope, receive, send):
+        body = self.bodies.get(scope["path"]) if scope["type"] == "http" else None
+        if body is None or scope["method"] != "GET" or _has_origin(scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+        content = body.render()
+        await send({
+            "type": "http.response.start",
+            "status": 200,
+            "headers": [
+                (b"content-length", str(len(content)).encode("latin-1")),
+                (b"content-type", b"application/json"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": content})
+
+
+def _has_origin(headers) -> bool:
+    return any(name == b"origin" for name, _ in headers)
@@ -0,0 +1,145 @@
+"""Admission control: per-user token buckets and a global concurrency limit"""
+
+import time
+from typing import Dict, Optional, Tuple
+
+from config import (
+    RATE_LIMIT_PER_SECOND, RATE_LIMIT_BURST, RATE_LIMIT_SWEEP_INTERVAL_SECONDS, CHAT_MAX_CONCURRENT
+)
+
+
+class TokenBucketLimiter:
+    """One token bucket per user, stored as a (tokens, updated_at) tuple
+
+    A bucket left idle long enough to refill completely behaves exactly like a
+    missing one, so sweep() drops those and the store only holds recently
+    active users. Sweeps run from acquire() at most every sweep_interval.
+    """
+
+    def __init__(self, rate: float = RATE_LIMIT_PER_SECOND, burst: float = RATE_LIMIT_BURST,
+                 sweep_interval: float = RATE_LIMIT_SWEEP_INTERVAL_SECONDS):
+        self.rate = rate
+        self.burst = burst
+        self.sweep_interval = sweep_interval
+        self.allowed = 0
+        self.rejected = 0
+        self._buckets: Dict[str, Tuple[float, float]] = {}
+        self._refill_seconds = burst / rate if rate > 0 else 0.0
+        self._next_sweep = 0.0
+
+    @property
+    def enabled(self) -> bool:
+        return self.rate > 0
+
+    def acquire(self, key: str, now: Optional[float] = None) -> float:
+        """Take a token for key: 0.0 if allowed, else seconds until one is available"""
+        if not self.enabled:
+            return 0.0
+        if now is None:
+            now = time.monotonic()
+        if now >= self._next_sweep:
+            self.sweep(now)
+
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            tokens = self.burst
+        else:
+            tokens = min(self.burst, bucket[0] + (now - bucket[1]) * self.rate)
+
+        if tokens < 1:
+            self._buckets[key] = (tokens, now)
+            self.rejected += 1
+            return (1 - tokens) / self.rate
+
+        self._buckets[key] = (tokens - 1, now)
+        self.allowed += 1
+        return 0.0
+
+    def sweep(self, now: Optional[float] = None) -> int:
+        """Drop buckets that have refilled completely; returns how many were removed"""
+        if now is None:
+            now = time.monotonic()
+        before = len(self._buckets)
+        cutoff = now - self._refill_seconds
+        self._buckets = {key: bucket for key, bucket in self._buckets.items() if bucket[1] > cutoff}
+        self._next_sweep = now + self.sweep_interval
+        return before - len(self._buckets)
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get_stats(self) -> Dict:
+        """Get limiter settings and counters"""
+        return {
+            "rate_per_second": self.rate,
+            "burst": self.burst,
+            "tracked_users": len(self._buckets),
+            "allowed": self.allowed,
+            "rejected": self.rejected
+        }
+
+
+class ConcurrencyLimiter:
+    """Caps requests in flight across the whole process"""
+
+    def __init__(self, limit: int = CHAT_MAX_CONCURRENT):
+        self.limit = limit
+        self.in_flight = 0
+        self.rejected = 0
+
+    def try_acquire(self) -> bool:
+        """Take a slot, or count a rejection and return False when all are taken"""
+        if self.limit and self.in_flight >= self.limit:
+            self.rejected += 1
+            return False
+        self.in_flight += 1
+        return True
+
+    def release(self):
+        self.in_flight -= 1
+
+    def get_stats(self) -> Dict:
+        """Get the limit, current load and rejection count"""
+        return {
+            "limit": self.limit,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected
+        }
+
+
+class ConcurrencyLimitMiddleware:
+    """Holds a ConcurrencyLimiter slot for each request to the limited paths
+
+    The slot is taken when the request arrives, before the body is read or
+    validated, and released once the response (including a streamed one) has
+    been sent. In-flight requests therefore build up whenever the app awaits
+    anything (reading the body, the worker pool, a slow client), which is
+    where an inline pipeline would otherwise never be refused. Requests over
+    the limit get a 503 with `rejection` as the JSON body.
+    """
+
+    def __init__(self, app, limiter: ConcurrencyLimiter, paths: Tuple[str, ...], rejection: bytes):
+        self.app = app
+        self.limiter = limiter
+        self.paths = frozenset(paths)
+        self.rejection = rejection
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"] not in self.paths or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+        if not self.limiter.try_acquire():
+            await send({
+                "type": "http.response.start",
+                "status": 503,
+                "headers": [
+                    (b"content-length", str(len(self.rejection)).encode("latin-1")),
+                    (b"content-type", b"application/json"),
+                ],
+            })
+            await send({"type": "http.response.body", "body": self.rejection})
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release()
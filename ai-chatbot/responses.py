@@ -1,5 +1,10 @@
 """Response templates for the chatbot"""
 
+import re
+
+from config import VERIFY_TEMPLATE_CACHE
+from nlp_utils import INTENT_HEADERS, clean_response
+
 RESPONSES = {
     'greeting': [
         "✨ Hello there! I'm Mayombo's AI Election Assistant. I'm here to help with anything related to the upcoming barangay election.\n\nWhat would you like to know? You can ask about:\n• Candidate information\n• Voting process\n• Eligibility requirements\n• Election security\n\nJust type 'help' for a full list of what I can do! 😊",
@@ -80,3 +85,56 @@ RESPONSES = {
         "Pasensya na, hindi ko naintindihan. Pwede bang mas specific? Type 'help' para sa mga sample questions! 😊",
     ]
 }
+
+
+# === PRECOMPUTED RESPONSE INDEX ===
+# Language markers used to split templates (same rules generate_reply used per request)
+TAGALOG_MARKERS = ['ang ', 'mga ', ' sa ', ' ng ', 'boto', 'kandidato', 'pagboto', 'botante']
+ENGLISH_EXCLUDE_MARKERS = [' ang ', ' mga ', ' sa ', ' ng ']
+
+
+def _clean_templates() -> dict:
+    """Clean every fixed template once: (intent, template) -> cleaned text"""
+    return {
+        (intent, template): clean_response(intent, template)
+        for intent, templates in RESPONSES.items()
+        for template in templates
+    }
+
+
+CLEANED_TEMPLATES = _clean_templates()
+
+
+def _reference_clean_response(intent: str, text: str) -> str:
+    """The original clean_response: patterns built and applied per call (verification only)"""
+    for header in INTENT_HEADERS.get(intent, ()):
+        text = re.sub(rf"\*\*.*{header}.*?\*\*\s*", "", text, flags=re.IGNORECASE)
+        text = re.sub(rf".*{header}.*:\s*", "", text, flags=re.IGNORECASE)
+    return text.strip()
+
+
+def verify_cleaned_templates():
+    """Assert every cached template equals the original per-call cleaning"""
+    for (intent, template), cached in CLEANED_TEMPLATES.items():
+        expected = _reference_clean_response(intent, template)
+        assert cached == expected, f"Cleaned template differs for {intent!r}: {template[:40]!r}"
+
+
+def _build_response_index() -> dict:
+    """Build (intent, language) -> tuple of cleaned templates"""
+    index = {}
+    for intent, templates in RESPONSES.items():
+        lowered = [t.lower() for t in templates]
+        tagalog = [t for t, low in zip(templates, lowered) if any(m in low for m in TAGALOG_MARKERS)]
+        english = [t for t, low in zip(templates, lowered) if not any(m in low for m in ENGLISH_EXCLUDE_MARKERS)]
+
+        # Fall back to every template when a language has no match
+        for language, filtered in (("tagalog", tagalog), ("english", english)):
+            index[(intent, language)] = tuple(CLEANED_TEMPLATES[(intent, t)] for t in (filtered or templates))
+    return index
+
+
+RESPONSE_INDEX = _build_response_index()
+
+if VERIFY_TEMPLATE_CACHE:
+    verify_cleaned_templates()
@@ -1,76 +1,117 @@
 """Session management for conversational memory"""
 
-from typing import Dict
+import asyncio
+import time
+from typing import Dict, Optional
+
+from config import SESSION_SWEEP_INTERVAL_SECONDS, SESSION_HISTORY_SIZE
+from session_store import (
+    Session, SessionStore, InMemorySessionStore, INTENT_BITS, LANGUAGE_BITS, create_session_store
+)
 
 
 class SessionManager:
     """Manages user sessions and conversation history with ML-like learning"""
     
-    def __init__(self):
-        self.sessions: Dict = {}
+    def __init__(self, store: Optional[SessionStore] = None, **store_options):
+        # store_options (idle_ttl, max_sessions) configure the default in-memory store
+        if store is None:
+            store = InMemorySessionStore(**store_options) if store_options else create_session_store()
+        self.store = store
         self.learning_patterns: Dict = {}  # Track patterns for ML behavior
     
-    def get_session(self, user_identifier: str) -> Dict:
+    @property
+    def evictions(self) -> Dict:
+        """Eviction counters of the underlying store"""
+        return self.store.evictions
+    
+    def get_session(self, user_identifier: str) -> Session:
         """Get or create session for user with learning context"""
-        if user_identifier not in self.sessions:
-            self.sessions[user_identifier] = {
-                "history": [],
-                "last_intent": None,
-                "last_position": None,
-                "topics_mentioned": [],  # ML: track topics for context
-                "languages_used": [],    # ML: track language preferences
-                "conversation_depth": 0  # ML: track engagement level
-            }
-        return self.sessions[user_identifier]
+        now = time.time()
+        
+        session = self.store.get(user_identifier, now)
+        if session is None:
+            session = Session(user_identifier, now)
+        session.last_seen = now
+        self.store.put(session)
+        return session
+    
+    def touch_session(self, session: Session):
+        """Mark a session held outside the store (e.g. by a WebSocket) as active"""
+        now = time.time()
+        self.store.get(session.key, now)  # Refresh its LRU position; the held copy stays authoritative
+        session.last_seen = now
+        self.store.put(session)
+    
+    def sweep_expired(self, now: Optional[float] = None) -> int:
+        """Evict sessions idle longer than the TTL; returns how many were removed"""
+        return self.store.sweep_expired(time.time() if now is None else now)
+    
+    async def run_sweeper(self, interval: float = SESSION_SWEEP_INTERVAL_SECONDS):
+        """Background task: periodically evict idle sessions (database work runs in a thread)"""
+        while True:
+            await asyncio.sleep(interval)
+            await self.store.sweep_expired_async(time.time())
+    
+    async def run_flusher(self):
+        """Background task: flush buffered session writes (shared stores only, in a thread)"""
+        while True:
+            await asyncio.sleep(self.store.flush_interval)
+            await self.store.flush_async()
     
-    def update_session(self, session: Dict, message: str, intent: str, position: str = None, language: str = "english"):
+    def update_session(self, session: Session, message: str, intent: str, position: str = None, language: str = "english"):
         """Update session with new message and context (with ML learning)"""
-        session["history"].append(message.lower())
+        # A small tuple is far lighter than a deque (which allocates a 64-slot block)
+        session.history = (session.history + (message.lower(),))[-SESSION_HISTORY_SIZE:]
         
-        # Keep last 5 messages for better context (increased from 3)
-        if len(session["history"]) > 5:
-            session["history"].pop(0)
+        session.last_intent = intent
         
-        session["last_intent"] = intent
-        
-        # ML Learning: Track topics for contextual follow-ups
-        if intent not in session["topics_mentioned"]:
-            session["topics_mentioned"].append(intent)
-        
-        # ML Learning: Track language preferences
-        if language not in session["languages_used"]:
-            session["languages_used"].append(language)
+        # ML Learning: Track topics and language preferences as bitsets
+        session.topics_mask |= INTENT_BITS.bit(intent)
+        session.languages_mask |= LANGUAGE_BITS.bit(language)
         
         # ML Learning: Increase conversation depth
-        session["conversation_depth"] += 1
+        session.conversation_depth += 1
         
         if position:
-            session["last_position"] = position
+            session.last_position = position
+        
+        self.store.put(session)
     
     def get_session_history(self, user_identifier: str) -> list:
         """Get conversation history for user"""
         session = self.get_session(user_identifier)
-        return session.get("history", [])
+        return list(session.history)
     
     def get_last_intent(self, user_identifier: str) -> str:
         """Get the last detected intent for user"""
         session = self.get_session(user_identifier)
-        return session.get("last_intent")
+        return session.last_intent
     
     def clear_session(self, user_identifier: str):
         """Clear session data for user"""
-        if user_identifier in self.sessions:
-            del self.sessions[user_identifier]
+        self.store.delete(user_identifier)
     
     def get_active_sessions_count(self) -> int:
         """Get count of active sessions"""
-        return len(self.sessions)
+        return len(self.store)
+    
+    def get_eviction_stats(self) -> Dict:
+        """Get session store limits and eviction counters"""
+        return {
+            "backend": type(self.store).__name__,
+            "active": len(self.store),
+            "max_sessions": self.store.max_sessions,
+            "idle_ttl_seconds": self.store.idle_ttl,
+            "evicted_expired": self.store.evictions["expired"],
+            "evicted_lru": self.store.evictions["lru"]
+        }
     
     def get_session_learning_data(self, user_identifier: str) -> dict:
         """Get ML learning data about user for smarter responses"""
         session = self.get_session(user_identifier)
         return {
-            "topics_discussed": session.get("topics_mentioned", []),
-            "languages_preferred": session.get("languages_used", []),
-            "conversation_depth": session.get("conversation_depth", 0)
+            "topics_discussed": session.topics_mentioned,
+            "languages_preferred": session.languages_used,
+            "conversation_depth": session.conversation_depth
         }
@@ -0,0 +1,397 @@
+"""Session state and pluggable session storage backends"""
+
+import asyncio
+import json
+import sqlite3
+import sys
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+
+from config import (
+    INTENT_PATTERNS, SESSION_IDLE_TTL_SECONDS, SESSION_MAX_COUNT, SESSION_HISTORY_SIZE,
+    SESSION_BACKEND, SESSION_SQLITE_PATH, SESSION_CACHE_SIZE, SESSION_CACHE_TTL_SECONDS,
+    SESSION_FLUSH_INTERVAL_SECONDS
+)
+
+
+class _BitRegistry:
+    """Assigns each distinct label a bit so per-session label sets fit in one int"""
+    
+    def __init__(self, labels=()):
+        self._bits: Dict[str, int] = {}
+        self._labels: List[str] = []
+        for label in labels:
+            self.bit(label)
+    
+    def bit(self, label: str) -> int:
+        """Get (registering on first use) the bit for a label"""
+        bit = self._bits.get(label)
+        if bit is None:
+            label = sys.intern(label)
+            bit = 1 << len(self._labels)
+            self._bits[label] = bit
+            self._labels.append(label)
+        return bit
+    
+    def mask(self, labels: List[str]) -> int:
+        """Pack labels into a bitset"""
+        mask = 0
+        for label in labels:
+            mask |= self.bit(label)
+        return mask
+    
+    def labels(self, mask: int) -> List[str]:
+        """Expand a bitset back to labels, in registration order"""
+        return [label for i, label in enumerate(self._labels) if mask >> i & 1]
+
+
+# Shared by every session: known intents first so topic order stays stable
+INTENT_BITS = _BitRegistry(
+    [intent for _, intent, _ in INTENT_PATTERNS]
+    + ['unknown', 'candidate_detail', 'candidate_suggestion']
+)
+LANGUAGE_BITS = _BitRegistry(['english', 'tagalog'])
+
+
+class Session:
+    """Compact per-user conversation state"""
+    
+    __slots__ = ("key", "history", "last_intent", "last_position", "topics_mask",
+                 "languages_mask", "conversation_depth", "last_seen")
+    
+    def __init__(self, key: str, now: float = 0.0):
+        self.key = key
+        self.history: Tuple[str, ...] = ()  # Last SESSION_HISTORY_SIZE messages
+        self.last_intent: Optional[str] = None
+        self.last_position: Optional[str] = None
+        self.topics_mask = 0         # ML: track topics for context (INTENT_BITS)
+        self.languages_mask = 0      # ML: track language preferences (LANGUAGE_BITS)
+        self.conversation_depth = 0  # ML: track engagement level
+        self.last_seen = now
+    
+    @property
+    def topics_mentioned(self) -> List[str]:
+        """Intents discussed in this session"""
+        return INTENT_BITS.labels(self.topics_mask)
+    
+    @property
+    def languages_used(self) -> List[str]:
+        """Languages the user has written in"""
+        return LANGUAGE_BITS.labels(self.languages_mask)
+    
+    def to_json(self) -> str:
+        """Serialize for a shared store (labels, not bits: bit order is per process)"""
+        return json.dumps([
+            list(self.history), self.last_intent, self.last_position,
+            self.topics_mentioned, self.languages_used, self.conversation_depth
+        ], ensure_ascii=False)
+    
+    @classmethod
+    def from_json(cls, key: str, data: str, last_seen: float) -> "Session":
+        """Rebuild a session serialized by to_json"""
+        history, last_intent, last_position, topics, languages, depth = json.loads(data)
+        session = cls(key, last_seen)
+        session.history = tuple(history[-SESSION_HISTORY_SIZE:])
+        session.last_intent = last_intent and sys.intern(last_intent)
+        session.last_position = last_position
+        session.topics_mask = INTENT_BITS.mask(topics)
+        session.languages_mask = LANGUAGE_BITS.mask(languages)
+        session.conversation_depth = depth
+        return session
+
+
+class SessionStore(ABC):
+    """Interface for session storage; SessionManager talks only to this"""
+    
+    # Seconds between background flushes, or None if writes are never buffered
+    flush_interval: Optional[float] = None
+    
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL_SECONDS, max_sessions: int = SESSION_MAX_COUNT):
+        self.idle_ttl = idle_ttl
+        self.max_sessions = max_sessions
+        self.evictions = {"expired": 0, "lru": 0}
+    
+    @abstractmethod
+    def get(self, key: str, now: float) -> Optional[Session]:
+        """Return the live session for key, or None if missing or expired"""
+    
+    @abstractmethod
+    def put(self, session: Session):
+        """Store a new or modified session"""
+    
+    @abstractmethod
+    def delete(self, key: str):
+        """Remove a session if present"""
+    
+    @abstractmethod
+    def sweep_expired(self, now: float) -> int:
+        """Evict sessions idle longer than the TTL; returns how many were removed"""
+    
+    def flush(self):
+        """Write out buffered changes"""
+    
+    async def flush_async(self):
+        """flush() for the event loop; stores that do I/O run it in a thread"""
+        self.flush()
+    
+    async def sweep_expired_async(self, now: float) -> int:
+        """sweep_expired() for the event loop; stores that do I/O run it in a thread"""
+        return self.sweep_expired(now)
+    
+    def close(self):
+        """Flush and release resources"""
+        self.flush()
+    
+    @abstractmethod
+    def __len__(self) -> int:
+        """Number of stored sessions"""
+
+
+class InMemorySessionStore(SessionStore):
+    """Process-local store with TTL and LRU eviction (single worker only)"""
+    
+    def __init__(self, idle_ttl: float = SESSION_IDLE_TTL_SECONDS, max_sessions: int = SESSION_MAX_COUNT):
+        super().__init__(idle_ttl, max_sessions)
+        # Ordered least- to most-recently used, so eviction always pops from the front
+        self.sessions: "OrderedDict[str, Session]" = OrderedDict()
+    
+    def get(self, key: str, now: float) -> Optional[Session]:
+        session = self.sessions.get(key)
+        if session is None:
+            return None
+        if now - session.last_seen > self.idle_ttl:
+            self._evict(key, "expired")
+            return None
+        self.sessions.move_to_end(key)
+        return session
+    
+    def put(self, session: Session):
+        if session.key not in self.sessions:
+            while len(self.sessions) >= self.max_sessions:
+                self._evict(next(iter(self.sessions)), "lru")
+        self.sessions[session.key] = session
+    
+    def delete(self, key: str):
+        self.sessions.pop(key, None)
+    
+    def _evict(self, key: str, reason: str):
+        """Drop a session and count why it was dropped"""
+        del self.sessions[key]
+        self.evictions[reason] += 1
+    
+    def sweep_expired(self, now: float) -> int:
+        removed = 0
+        
+        # Oldest first: stop at the first session that is still fresh
+        while self.sessions:
+            oldest, session = next(iter(self.sessions.items()))
+            if now - session.last_seen <= self.idle_ttl:
+                break
+            self._evict(oldest, "expired")
+            removed += 1
+        
+        return removed
+    
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+
+class SQLiteSessionStore(SessionStore):
+    """Sessions shared across worker processes through a SQLite WAL database
+    
+    Reads go through a small local cache whose entries are trusted for
+    cache_ttl seconds, so back-to-back requests skip the database. Writes and
+    deletes are buffered and flushed in one transaction every flush_interval
+    seconds. The *_async variants used by the background tasks run the
+    database writes in a thread on a second connection, so waiting on another
+    worker's lock (up to busy_timeout) never stalls the event loop; WAL lets
+    the loop keep reading meanwhile.
+    """
+    
+    def __init__(self, path: str = SESSION_SQLITE_PATH,
+                 idle_ttl: float = SESSION_IDLE_TTL_SECONDS, max_sessions: int = SESSION_MAX_COUNT,
+                 cache_size: int = SESSION_CACHE_SIZE, cache_ttl: float = SESSION_CACHE_TTL_SECONDS,
+                 flush_interval: float = SESSION_FLUSH_INTERVAL_SECONDS):
+        super().__init__(idle_ttl, max_sessions)
+        self.path = path
+        self.cache_size = cache_size
+        self.cache_ttl = cache_ttl
+        self.flush_interval = flush_interval
+        self._cache: "OrderedDict[str, Tuple[Session, float]]" = OrderedDict()
+        self._dirty: Dict[str, Optional[Session]] = {}     # None marks a delete
+        self._flushing: Dict[str, Optional[Session]] = {}  # Batch being written right now
+        self._flush_lock = asyncio.Lock()        # One flush or sweep at a time (event loop side)
+        self._write_lock = threading.Lock()      # Guards the writer connection
+        self._count = 0
+        
+        self._db = self._connect()      # Reads, on the event loop
+        self._writer = self._connect()  # Writes, on whichever thread flushes
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            "key TEXT PRIMARY KEY, data TEXT NOT NULL, last_seen REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS sessions_last_seen ON sessions (last_seen)")
+        self._refresh_count()
+    
+    def _connect(self) -> sqlite3.Connection:
+        db = sqlite3.connect(self.path, isolation_level=None, check_same_thread=False)
+        db.execute("PRAGMA journal_mode=WAL")
+        db.execute("PRAGMA synchronous=NORMAL")
+        db.execute("PRAGMA busy_timeout=5000")
+        return db
+    
+    def _refresh_count(self):
+        """Re-read the shared session count"""
+        self._count = self._writer.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+    
+    def _cache_put(self, session: Session, now: float):
+        """Add to the local read cache, dropping the least recently used entry"""
+        self._cache[session.key] = (session, now)
+        self._cache.move_to_end(session.key)
+        while len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+    
+    def get(self, key: str, now: float) -> Optional[Session]:
+        # Unflushed local changes (including one being written) are always the newest copy
+        pending = self._dirty if key in self._dirty else self._flushing
+        if key in pending:
+            session = pending[key]
+            if session is None:
+                return None
+        else:
+            cached = self._cache.get(key)
+            if cached is not None and now - cached[1] <= self.cache_ttl:
+                session = cached[0]
+            else:
+                row = self._db.execute(
+                    "SELECT data, last_seen FROM sessions WHERE key = ?", (key,)
+                ).fetchone()
+                if row is None:
+                    self._cache.pop(key, None)
+                    return None
+                session = Session.from_json(key, row[0], row[1])
+                self._cache_put(session, now)
+        
+        if now - session.last_seen > self.idle_ttl:
+            self.delete(key)
+            self.evictions["expired"] += 1
+            return None
+        return session
+    
+    def put(self, session: Session):
+        self._dirty[session.key] = session
+        if session.key in self._cache:
+            self._cache[session.key] = (session, self._cache[session.key][1])
+    
+    def delete(self, key: str):
+        self._dirty[key] = None
+        self._cache.pop(key, None)
+    
+    def _take_dirty(self) -> Tuple[List[Tuple[str, str, float]], List[Tuple[str]]]:
+        """Move buffered changes to _flushing and serialize them (event loop side)"""
+        self._flushing, self._dirty = self._dirty, {}
+        rows = [(s.key, s.to_json(), s.last_seen) for s in self._flushing.values() if s is not None]
+        deleted = [(key,) for key, s in self._flushing.items() if s is None]
+        return rows, deleted
+    
+    def _restore_dirty(self):
+        """Put a batch that failed to write back in the buffer, under any newer changes"""
+        for key, session in self._flushing.items():
+            self._dirty.setdefault(key, session)
+        self._flushing = {}
+    
+    def _write(self, rows: List[Tuple[str, str, float]], deleted: List[Tuple[str]]):
+        """Apply one batch in a single transaction, then enforce the cap (any thread)"""
+        with self._write_lock:
+            with self._writer:
+                self._writer.execute("BEGIN")
+                self._writer.executemany("DELETE FROM sessions WHERE key = ?", deleted)
+                self._writer.executemany(
+                    "INSERT INTO sessions (key, data, last_seen) VALUES (?, ?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET data = excluded.data, last_seen = excluded.last_seen",
+                    rows,
+                )
+            
+            self._refresh_count()
+            overflow = self._count - self.max_sessions
+            if overflow > 0:
+                cursor = self._writer.execute(
+                    "DELETE FROM sessions WHERE key IN "
+                    "(SELECT key FROM sessions ORDER BY last_seen LIMIT ?)", (overflow,)
+                )
+                self.evictions["lru"] += cursor.rowcount
+                self._count -= cursor.rowcount
+    
+    def _delete_expired(self, cutoff: float) -> int:
+        """Delete rows idle since before cutoff (any thread)"""
+        with self._write_lock:
+            cursor = self._writer.execute("DELETE FROM sessions WHERE last_seen < ?", (cutoff,))
+            self._refresh_count()
+        self.evictions["expired"] += cursor.rowcount
+        return cursor.rowcount
+    
+    def _drop_cached_before(self, cutoff: float):
+        """Forget cached sessions idle since before cutoff (event loop side)"""
+        for key in [k for k, (s, _) in self._cache.items() if s.last_seen < cutoff]:
+            del self._cache[key]
+    
+    def flush(self):
+        """Write every buffered change in one transaction, on the calling thread"""
+        if not self._dirty:
+            return
+        try:
+            self._write(*self._take_dirty())
+        except sqlite3.Error:
+            self._restore_dirty()
+            raise
+        self._flushing = {}
+    
+    async def flush_async(self):
+        """Write every buffered change in one transaction, in a worker thread"""
+        async with self._flush_lock:
+            if not self._dirty:
+                return
+            try:
+                await asyncio.to_thread(self._write, *self._take_dirty())
+            except sqlite3.Error as e:
+                self._restore_dirty()
+                print(f"[ERROR] Session flush failed, will retry: {e}")
+                return
+            self._flushing = {}
+    
+    def sweep_expired(self, now: float) -> int:
+        self.flush()
+        cutoff = now - self.idle_ttl
+        self._drop_cached_before(cutoff)
+        return self._delete_expired(cutoff)
+    
+    async def sweep_expired_async(self, now: float) -> int:
+        await self.flush_async()
+        cutoff = now - self.idle_ttl
+        self._drop_cached_before(cutoff)
+        async with self._flush_lock:
+            try:
+                return await asyncio.to_thread(self._delete_expired, cutoff)
+            except sqlite3.Error as e:
+                print(f"[ERROR] Session sweep failed: {e}")
+                return 0
+    
+    def close(self):
+        self.flush()
+        self._db.close()
+        self._writer.close()
+    
+    def __len__(self) -> int:
+        # Shared count as of the last flush or sweep
+        return self._count
+
+
+def create_session_store(backend: str = SESSION_BACKEND) -> SessionStore:
+    """Build the configured session store ("memory" or "sqlite")"""
+    if backend == "sqlite":
+        return SQLiteSessionStore()
+    if backend != "memory":
+        print(f"[ERROR] Unknown session backend '{backend}', using in-memory sessions")
+    return InMemorySessionStore()
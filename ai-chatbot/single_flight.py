@@ -0,0 +1,122 @@
+"""Coalesce identical concurrent requests so their work runs once"""
+
+import asyncio
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Iterable, Iterator, List, Tuple
+
+from config import SINGLE_FLIGHT_REPLAY_SECONDS
+
+
+class SingleFlight:
+    """Run one call per key at a time; concurrent callers share its outcome
+
+    A finished result is also replayed for replay_seconds, so a retry that
+    arrives just after the original completed gets the same answer instead of
+    running again (in inline mode /chat never yields to the event loop, so
+    such retries can never overlap the original).
+    """
+
+    def __init__(self, replay_seconds: float = SINGLE_FLIGHT_REPLAY_SECONDS):
+        self.replay_seconds = replay_seconds
+        self.leaders = 0
+        self.coalesced = 0
+        self.replayed = 0
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+        # Ordered by completion, so with one fixed window the oldest expire first
+        self._recent: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def _expire(self, now: float):
+        while self._recent:
+            key, (expires, _) = next(iter(self._recent.items()))
+            if expires > now:
+                break
+            del self._recent[key]
+
+    async def run(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        """Await func() unless an identical call is running or just finished"""
+        now = time.monotonic()
+        self._expire(now)
+        recent = self._recent.get(key)
+        if recent is not None:
+            self.replayed += 1
+            return recent[1]
+
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        future = self._inflight[key] = asyncio.get_running_loop().create_future()
+        self.leaders += 1
+        try:
+            result = await func()
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved: there may be no waiters
+            raise
+        finally:
+            del self._inflight[key]
+
+        future.set_result(result)
+        if self.replay_seconds > 0:
+            self._recent[key] = (time.monotonic() + self.replay_seconds, result)
+        return result
+
+    def get_stats(self) -> Dict:
+        """Get counters of executed, coalesced and replayed calls"""
+        return {
+            "executed": self.leaders,
+            "coalesced": self.coalesced,
+            "replayed": self.replayed,
+            "in_flight": len(self._inflight),
+            "replay_seconds": self.replay_seconds
+        }
+
+
+_EXHAUSTED = object()
+
+
+class ReplayableIterable:
+    """A one-shot iterator that any number of consumers can iterate from the start
+
+    Items are pulled from the source only when the consumer furthest ahead
+    asks for them, and are kept, so later or concurrent iterations (from any
+    thread, e.g. StreamingResponse's threadpool) replay them in order and then
+    continue the source. A shared reply body therefore stays lazy for the
+    first response that reads it.
+    """
+
+    def __init__(self, source: Iterable):
+        self._source = iter(source)
+        self._items: List = []
+        self._exhausted = False
+        self._lock = threading.Lock()
+
+    def __iter__(self) -> Iterator:
+        index = 0
+        while index < len(self._items) or self._pull(index):
+            yield self._items[index]
+            index += 1
+
+    def _pull(self, index: int) -> bool:
+        """Make item `index` available; False once the source is exhausted"""
+        with self._lock:
+            if index < len(self._items):
+                return True  # Another consumer pulled it meanwhile
+            if self._exhausted:
+                return False
+            try:
+                item = next(self._source, _EXHAUSTED)
+            except BaseException:
+                self._exhausted = True
+                raise
+            if item is _EXHAUSTED:
+                self._exhausted = True
+                return False
+            self._items.append(item)
+            return True
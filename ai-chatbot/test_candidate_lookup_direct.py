@@ -0,0 +1,124 @@
+"""Test exact and typo-tolerant candidate name lookup - Direct test"""
+
+import csv
+import os
+import tempfile
+import time
+
+from config import FUZZY_ANSWER_CONFIDENCE
+from candidate_manager import CandidateManager
+from bench_corpus import synthetic_roster_rows
+
+manager = CandidateManager()
+
+
+def reference_candidate_info(message):
+    """Original get_candidate_info: substring test for every candidate"""
+    message_lower = message.lower()
+    for position, candidates in manager.candidates.items():
+        for candidate in candidates:
+            if candidate['name'].lower() in message_lower:
+                return manager.format_candidate_info(position, candidate)
+    return None
+
+
+all_names = [c['name'] for candidates in manager.candidates.values() for c in candidates]
+
+test_messages = [
+    "Juan Dela Cruz",
+    "sino si maria santos?",
+    "PEDRO REYES party?",
+    "tell me about ana lopez and juan dela cruz",
+    "juan dela cruzzz",
+    "juan dela krus",
+    "who is running",
+    "",
+] + [f"info about {name} please" for name in all_names]
+
+print("=" * 70)
+print("CANDIDATE LOOKUP PARITY TEST")
+print("=" * 70)
+
+failed = 0
+for message in test_messages:
+    expected = reference_candidate_info(message)
+    got = manager.get_candidate_info(message)
+    if got != expected:
+        failed += 1
+        print(f"FAIL '{message}'")
+
+both = manager.find_candidates("ana lopez at juan dela cruz")
+print(f"Multiple mentions found: {[c['name'] for _, c in both]}")
+if len(both) != 2:
+    failed += 1
+    print("FAIL: expected both candidates to be found")
+
+# Typo-tolerant lookup: (message, expected name or None)
+fuzzy_cases = [
+    ("Juan dela Krus", "Juan Dela Cruz"),
+    ("maria santo", "Maria Santos"),
+    ("sino si pedro reyez", "Pedro Reyes"),
+    ("ana lopes party?", "Ana Lopez"),
+    ("paano bumoto", None),
+    ("thank you", None),
+    ("asdf qwerty", None),
+]
+for message, expected_name in fuzzy_cases:
+    match = manager.find_candidate_fuzzy(message)
+    got_name = match[1]['name'] if match else None
+    status = "PASS" if got_name == expected_name else "FAIL"
+    if status == "FAIL":
+        failed += 1
+    confidence = f"{match[2]:.2f}" if match else "-"
+    print(f"Fuzzy '{message}' -> {got_name} (confidence: {confidence}) {status}")
+
+# Realistic roster: the real candidates plus thousands of similar synthetic names
+# (many "Juan ..." and two-syllable surnames such as "Juan Dala")
+with open(manager.csv_path, encoding="utf-8") as f:
+    base_csv = f.read()
+fd, large_path = tempfile.mkstemp(suffix=".csv")
+with os.fdopen(fd, "w", encoding="utf-8", newline="") as f:
+    f.write(base_csv if base_csv.endswith("\n") else base_csv + "\n")
+    csv.writer(f).writerows(synthetic_roster_rows(5000))
+large = CandidateManager(large_path)
+os.remove(large_path)
+
+large_cases = [
+    ("Juan dela Krus", "Juan Dela Cruz"),
+    ("sino si juan dela krus", "Juan Dela Cruz"),
+    ("sino si pedro reyez", "Pedro Reyes"),
+    ("paano bumoto", None),
+]
+for message, expected_name in large_cases:
+    match = large.find_candidate_fuzzy(message)
+    got_name = match[1]['name'] if match and match[2] >= FUZZY_ANSWER_CONFIDENCE else None
+    status = "PASS" if got_name == expected_name else "FAIL"
+    if status == "FAIL":
+        failed += 1
+    confidence = f"{match[2]:.2f}" if match else "-"
+    print(f"Large roster '{message}' -> {match[1]['name'] if match else None} (confidence: {confidence}) {status}")
+
+miss_messages = ["what is the weather today in manila city", "ano ang gagawin ni juan at ana bukas",
+                 "asdf qwerty", "kailan ang eleksyon sa amin"]
+started = time.perf_counter()
+for _ in range(50):
+    for message in miss_messages:
+        large.find_candidate_fuzzy(message)
+per_miss_ms = (time.perf_counter() - started) / (50 * len(miss_messages)) * 1000
+status = "PASS" if per_miss_ms < 1.0 else "FAIL"
+if status == "FAIL":
+    failed += 1
+print(f"Fuzzy miss with {large.get_total_candidates()} candidates: {per_miss_ms:.3f} ms {status}")
+
+# Cost must not grow with message length (messages far longer than any name are skipped)
+long_message = "sino si juan dela krus " * 4000
+started = time.perf_counter()
+long_match = large.find_candidate_fuzzy(long_message)
+long_ms = (time.perf_counter() - started) * 1000
+status = "PASS" if long_match is None and long_ms < 5.0 else "FAIL"
+if status == "FAIL":
+    failed += 1
+print(f"Fuzzy lookup on a {len(long_message)}-character message: {long_ms:.3f} ms {status}")
+
+print(f"\nMessages checked: {len(test_messages) + len(fuzzy_cases) + len(large_cases)}")
+print("Status: ALL TESTS PASSED" if failed == 0 else "Status: SOME TESTS FAILED")
@@ -0,0 +1,91 @@
+"""Test live roster reload, refused reloads and the atomic swap - Direct test"""
+
+import asyncio
+import os
+import shutil
+import tempfile
+
+from candidate_manager import CandidateManager
+
+csv_path = os.path.join(tempfile.mkdtemp(), "candidates.csv")
+shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "candidates.csv"), csv_path)
+
+manager = CandidateManager(csv_path)
+original_total = manager.get_stats()["total"]
+
+
+def write_roster(text, mtime_offset):
+    """Replace the CSV and give it a distinct mtime, as an edit would"""
+    with open(csv_path, "w", encoding="utf-8") as f:
+        f.write(text)
+    version = (manager.roster_version or 0) + mtime_offset
+    os.utime(csv_path, (version, version))
+
+
+print("=" * 70)
+print("ROSTER RELOAD TEST")
+print("=" * 70)
+
+results = []
+
+# A successful reload swaps in the new roster and its indexes
+old_roster = manager._roster
+old_version = manager.roster_version
+write_roster(
+    "Position,Candidate ID,Candidate Name,Party,Votes\n"
+    "Barangay Kapitan,KPT009,Rosa Villanueva,Bagong Umaga,0\n"
+    "SK Chairman,SK009,Lito Marquez,Kabataan Muna,0\n",
+    10
+)
+outcome = asyncio.run(manager.reload_candidates())
+results.append(("Reload reports success", outcome["status"] == "ok" and outcome["rows"] == 2))
+results.append(("New roster served", manager.get_stats()["total"] == 2 and manager.roster_version != old_version))
+results.append(("Indexes rebuilt", manager.get_candidate_info("sino si rosa villanueva") is not None
+                and manager.get_candidate_info("sino si juan dela cruz") is None))
+results.append(("Fuzzy index rebuilt", (manager.find_candidate_fuzzy("lito markez") or (None,))[0] == "SK Chairman"))
+
+# The old snapshot is never modified: readers holding it see a consistent roster
+results.append(("Old snapshot untouched", old_roster.total == original_total
+                and old_roster.name_index is not manager._roster.name_index))
+
+# Failed reloads keep serving the previous roster
+for label, text in [
+    ("Header-only CSV refused", "Position,Candidate ID,Candidate Name,Party,Votes\n"),
+    ("Empty file refused", ""),
+    ("Wrong columns refused", "Name,Role\nRosa Villanueva,Kapitan\n"),
+]:
+    write_roster(text, 10)
+    outcome = asyncio.run(manager.reload_candidates())
+    results.append((label, outcome["status"] == "error" and manager.get_stats()["total"] == 2
+                    and manager.get_candidate_info("sino si rosa villanueva") is not None))
+
+os.remove(csv_path)
+outcome = asyncio.run(manager.reload_candidates())
+results.append(("Missing file refused", outcome["status"] == "error" and manager.get_stats()["total"] == 2))
+
+# Readers never see a half-built roster while a reload runs in its thread
+shutil.copy(os.path.join(os.path.dirname(os.path.abspath(__file__)), "candidates.csv"), csv_path)
+os.utime(csv_path, (manager.roster_version + 10, manager.roster_version + 10))
+
+
+async def read_during_reload():
+    reload = asyncio.create_task(manager.reload_candidates())
+    totals = set()
+    while not reload.done():
+        stats = manager.get_stats()
+        totals.add((stats["total"], sum(len(c) for c in manager.candidates.values())))
+        await asyncio.sleep(0)
+    await reload
+    return totals
+
+
+totals = asyncio.run(read_during_reload())
+results.append(("Atomic swap", totals and totals <= {(2, 2), (original_total, original_total)}
+                and manager.get_stats()["total"] == original_total))
+
+for name, passed in results:
+    print(f"{name:.<50} {'PASS' if passed else 'FAIL'}")
+
+passed = sum(1 for _, ok in results if ok)
+print(f"\nTests Passed: {passed}/{len(results)}")
+print("Status: ALL TESTS PASSED" if passed == len(results) else "Status: SOME TESTS FAILED")
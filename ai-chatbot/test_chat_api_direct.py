@@ -0,0 +1,100 @@
+"""Test the HTTP and WebSocket chat endpoints end to end - Direct test"""
+
+import json
+import os
+
+os.environ.setdefault("CHATBOT_CONVERSATION_LOG", "")  # Keep test traffic out of the log
+os.environ["CHATBOT_GATEWAY_TOKEN"] = "test-gateway-token"
+os.environ["CHATBOT_ADMIN_TOKEN"] = "test-admin-token"
+
+from fastapi.testclient import TestClient
+
+import main
+
+print("=" * 70)
+print("CHAT API TEST")
+print("=" * 70)
+
+results = []
+GATEWAY = {"X-Gateway-Token": "test-gateway-token"}
+ONE_ITEM = {"messages": [{"user_id": "v1", "message": "hello"}]}
+
+with TestClient(main.app) as client:
+    # /chat/batch is for gateways only, and items are length-capped
+    anonymous = client.post("/chat/batch", json=ONE_ITEM)
+    results.append(("/chat/batch without a token is refused", anonymous.status_code == 403))
+    wrong = client.post("/chat/batch", json=ONE_ITEM, headers={"X-Gateway-Token": "guess"})
+    results.append(("/chat/batch with a wrong token is refused", wrong.status_code == 403))
+    too_long = {"messages": [{"user_id": "v1", "message": "a" * (main.CHAT_BATCH_MAX_MESSAGE_CHARS + 1)}]}
+    rejected = client.post("/chat/batch", json=too_long, headers=GATEWAY)
+    results.append(("Over-long batch message rejected", rejected.status_code == 422))
+    allowed = client.post("/chat/batch", json=ONE_ITEM, headers=GATEWAY)
+    results.append(("/chat/batch with the token answers", allowed.status_code == 200
+                    and allowed.json()["replies"][0]["user_id"] == "v1"))
+
+    # /chat caps message length like /ws/chat
+    long_chat = client.post("/chat", json={"message": "a" * (main.CHAT_MAX_MESSAGE_CHARS + 1)})
+    results.append(("Over-long /chat message rejected", long_chat.status_code == 422))
+
+    # A client that is rate limited on /chat cannot keep going through /chat/batch
+    main.rate_limiter._buckets.clear()
+    for _ in range(main.rate_limiter.burst):
+        client.post("/chat", json={"message": "hello"})
+    limited = client.post("/chat", json={"message": "hello"})
+    batch = client.post("/chat/batch", json=ONE_ITEM, headers=GATEWAY)
+    results.append(("/chat rate limited after the burst", limited.status_code == 429))
+    results.append(("/chat/batch shares the rate limit", batch.status_code == 429 and "Retry-After" in batch.headers))
+    main.rate_limiter._buckets.clear()
+
+    # The concurrency cap covers /chat/batch too
+    main.concurrency_limiter.in_flight = main.concurrency_limiter.limit
+    busy = client.post("/chat/batch", json=ONE_ITEM, headers=GATEWAY)
+    main.concurrency_limiter.in_flight = 0
+    results.append(("/chat/batch over the concurrency cap gets 503", busy.status_code == 503))
+
+    # /ws/chat answers bad frames with a usage error and keeps the session across messages
+    with client.websocket_connect("/ws/chat") as ws:
+        ws.send_text("not json")
+        invalid = ws.receive_json()
+        ws.send_bytes(b"\x00\x01")
+        binary = ws.receive_json()
+        ws.send_json({"message": "Sino ang kapitan?"})
+        first = ws.receive_json()
+        ws.send_json({"message": "and for SK?"})
+        follow_up = ws.receive_json()
+    results.append(("WS invalid JSON gets a usage error", invalid == {"error": main.WS_USAGE_ERROR}))
+    results.append(("WS binary frame gets a usage error", binary == {"error": main.WS_USAGE_ERROR}))
+    results.append(("WS answers after bad frames", "Barangay Kapitan" in first.get("reply", "")))
+    results.append(("WS follow-up resolves to SK", "Mga Kandidato para sa SK Chairman" in follow_up.get("reply", "")))
+
+    # ?stream=true sends the full listing as chunk events in order, then done
+    streamed = client.post("/chat?stream=true", json={"message": "sino lahat ng kandidato"})
+    events = []
+    for block in streamed.text.strip().split("\n\n"):
+        event_line, data_line = block.split("\n")
+        events.append((event_line[len("event: "):], json.loads(data_line[len("data: "):])))
+    chunks = [data["text"] for event, data in events if event == "chunk"]
+    listing = main.candidate_manager.format_all_candidates()
+    results.append(("SSE response is an event stream", streamed.headers["content-type"].startswith("text/event-stream")))
+    results.append(("SSE ends with a single done event", [event for event, _ in events].count("done") == 1
+                    and events[-1] == ("done", {})))
+    results.append(("SSE sends the listing in several chunks", len(chunks) > 3 and listing in "".join(chunks)))
+    positions = [next(i for i, chunk in enumerate(chunks) if title in chunk)
+                 for title in ("All Candidates", "Barangay Kapitan", "SK Chairman", "Kagawad")]
+    results.append(("SSE chunks arrive in listing order", positions == sorted(positions)))
+    plain = client.post("/chat", json={"message": "sino lahat ng kandidato"})
+    results.append(("JSON reply carries the same listing", listing in plain.json()["reply"]))
+
+    # The admin reload needs the exact admin token
+    no_admin = client.post("/admin/reload-candidates")
+    wrong_admin = client.post("/admin/reload-candidates", headers={"X-Admin-Token": "test-admin-tokeN"})
+    admin = client.post("/admin/reload-candidates", headers={"X-Admin-Token": "test-admin-token"})
+    results.append(("Admin reload refuses missing or wrong tokens", no_admin.status_code == wrong_admin.status_code == 403))
+    results.append(("Admin reload accepts the token", admin.status_code == 200))
+
+for name, passed in results:
+    print(f"{name:.<50} {'PASS' if passed else 'FAIL'}")
+
+passed = sum(1 for _, ok in results if ok)
+print(f"\nTests Passed: {passed}/{len(results)}")
+print("Status: ALL TESTS PASSED" if passed == len(results) else "Status: SOME TESTS FAILED")
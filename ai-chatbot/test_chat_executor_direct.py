@@ -0,0 +1,87 @@
+"""Test that thread and process pools compose the same replies as inline - Direct test"""
+
+import asyncio
+
+from candidate_manager import CandidateManager
+from chat_executor import ChatExecutor, ExecutorBusy
+from chat_pipeline import body_text, compose_reply
+from responses import RESPONSE_INDEX
+from session_store import Session
+
+print("=" * 70)
+print("CHAT EXECUTOR TEST")
+print("=" * 70)
+
+results = []
+candidates = CandidateManager()
+
+MESSAGES = [
+    "Sino ang kapitan?",
+    "who are the sk candidates",
+    "sino lahat ng kandidato",
+    "sino si juan dela cruz",
+    "paano bumoto?",
+    "hello",
+]
+
+
+def follow_up_session() -> Session:
+    """A session that just asked about the kapitan, so "and for SK?" is a follow-up"""
+    session = Session("10.0.0.8")
+    session.last_intent = "kapitan_candidates"
+    session.last_position = "Barangay Kapitan"
+    return session
+
+
+def summary(plan):
+    """Everything about a reply except the randomly chosen opener and sign-off"""
+    return plan.intent, plan.position, plan.language, body_text(plan.body)
+
+
+def templated(plan) -> bool:
+    """A plain intent's body is one of its (randomly chosen) templates"""
+    return body_text(plan.body) in RESPONSE_INDEX.get((plan.intent, plan.language), ())
+
+
+def same_reply(inline, pooled) -> bool:
+    if summary(inline) == summary(pooled):
+        return True
+    return summary(inline)[:3] == summary(pooled)[:3] and templated(inline) and templated(pooled)
+
+
+inline = [compose_reply(candidates, message, Session("10.0.0.8")) for message in MESSAGES]
+inline.append(compose_reply(candidates, "and for SK?", follow_up_session()))
+
+
+async def pooled_replies(executor: ChatExecutor):
+    plans = [await executor.compose(message, Session("10.0.0.8")) for message in MESSAGES]
+    plans.append(await executor.compose("and for SK?", follow_up_session()))
+    return plans
+
+for mode in ("thread", "process"):
+    executor = ChatExecutor(candidates, mode, workers=2, queue_size=4)
+    executor.start()
+    try:
+        pooled = asyncio.run(pooled_replies(executor))
+    finally:
+        executor.shutdown()
+    results.append((f"{mode} replies match inline", all(same_reply(a, b) for a, b in zip(inline, pooled))))
+    results.append((f"{mode} bodies are materialized", all(isinstance(p.body, tuple) for p in pooled)))
+    results.append((f"{mode} follow-up resolves to SK", pooled[-1].intent == "sk_candidates"))
+    results.append((f"{mode} counts completed jobs", executor.get_stats()["completed"] == len(pooled)))
+
+executor = ChatExecutor(candidates, "thread", workers=1, queue_size=1)
+executor.pending = executor.queue_size
+try:
+    asyncio.run(executor.compose("hello", Session("10.0.0.8")))
+    rejected = False
+except ExecutorBusy:
+    rejected = True
+results.append(("Full queue raises ExecutorBusy", rejected and executor.get_stats()["rejected"] == 1))
+
+for name, passed in results:
+    print(f"{name:.<50} {'PASS' if passed else 'FAIL'}")
+
+passed = sum(1 for _, ok in results if ok)
+print(f"\nTests Passed: {passed}/{len(results)}")
+print("Status: ALL TESTS PASSED" if passed == len(results) else "Status: SOME TESTS FAILED")
@@ -0,0 +1,63 @@
+"""Test compiled intent engine against the original per-pattern loop - Direct test"""
+
+import re
+from config import INTENT_PATTERNS
+from nlp_utils import detect_intent
+
+
+def reference_detect_intent(message):
+    """Original detect_intent loop: re.search every pattern, keep the best score"""
+    message = message.lower().strip()
+    best_intent = 'unknown'
+    best_score = 0.0
+    for pattern, intent, base_score in INTENT_PATTERNS:
+        if re.search(pattern, message, re.IGNORECASE):
+            if base_score > best_score:
+                best_score = base_score
+                best_intent = intent
+    return best_intent, best_score
+
+
+# Message corpus: English, Tagalog, Taglish, follow-ups, noise and non-ASCII input
+corpus = [
+    "hello", "Hi there!", "good morning po", "kumusta ka?", "h3ll0", "yo sup",
+    "thank you", "maraming salamat", "ok maraming salamat", "salamat po", "ty",
+    "goodbye", "bye", "sige na", "paalam",
+    "help", "ano kaya mong gawin", "what can you do",
+    "paano bumoto?", "paano mag vote", "pwede ko ba mag vote", "paano mag-vote please",
+    "how do i vote", "voting steps", "mag vote na tayo",
+    "eligible ba ako", "ano ang requirements para bumoto", "ilang taon para bumoto",
+    "how to register", "saan magparehistro", "voter id ko nawala",
+    "is it secure?", "may daya ba", "blockchain ba to",
+    "kailan ang halalan para bumoto", "where to vote", "when can i vote",
+    "sino ang nanalo", "live results", "who will win",
+    "why vote", "bakit bumoto", "karapatan ko ba",
+    "hindi gumagana", "forgot password", "may problema",
+    "ano ang platform na ito", "what is the system",
+    "ano ang tungkulin ng kagawad", "what is the role of sk chairman",
+    "sino ang mga kandidato", "sino tumatakbo", "who are the candidates",
+    "all candidates", "show all", "lahat ng kandidato",
+    "barangay kapitan", "who is running for captain", "sk chairman", "kagawad list",
+    "and for sk?", "how about kagawad", "Juan Dela Cruz", "maria santos party?",
+    "", "   ", "asdf qwerty", "12345", "!!!", "ok", "hmm",
+    "HELLO THERE", "PAANO BUMOTO", "Thank You So Much!",
+    "hello 😊", "salamat po 🙏", "ſk chairman", "hı", "İ need help",
+    "paano ako bumoto sa barangay election at sino ang mga kandidato",
+    "thanks, how do i register and is it safe?",
+]
+
+print("=" * 70)
+print("INTENT ENGINE PARITY TEST")
+print("=" * 70)
+
+mismatches = []
+for message in corpus:
+    expected = reference_detect_intent(message)
+    got = detect_intent(message)
+    if got != expected:
+        mismatches.append((message, expected, got))
+        print(f"FAIL '{message}': expected {expected}, got {got}")
+
+print(f"\nMessages checked: {len(corpus)}")
+print(f"Mismatches: {len(mismatches)}")
+print("Status: ALL TESTS PASSED" if not mismatches else "Status: SOME TESTS FAILED")
@@ -0,0 +1,82 @@
+"""Test the shared keyword scanner against the original language/vibe loops - Direct test"""
+
+import csv
+import os
+
+from config import VIBE_KEYWORDS
+from nlp_utils import (
+    detect_language, detect_vibe, detect_language_and_vibe,
+    ENGLISH_INDICATORS, TAGALOG_INDICATORS, TAGLISH_PATTERNS
+)
+from bench_corpus import ALL_MESSAGES
+
+
+def reference_detect_language(message):
+    """Original detect_language: three passes of substring tests"""
+    msg_lower = message.lower().strip()
+    english_score = sum(1 for word in ENGLISH_INDICATORS if word in msg_lower)
+    tagalog_score = sum(1 for word in TAGALOG_INDICATORS if word in msg_lower)
+    taglish_score = sum(1 for pattern in TAGLISH_PATTERNS if pattern in msg_lower)
+
+    if taglish_score > 0:
+        return 'tagalog'
+    elif english_score > tagalog_score:
+        return 'english'
+    elif tagalog_score > 0:
+        return 'tagalog'
+    else:
+        return 'english'
+
+
+def reference_detect_vibe(message, language):
+    """Original detect_vibe: first negative keyword, then first positive keyword"""
+    msg_lower = message.lower()
+    lang_kw = VIBE_KEYWORDS.get(language, VIBE_KEYWORDS["english"])
+    for kw in lang_kw["negative"]:
+        if kw in msg_lower:
+            return "negative"
+    for kw in lang_kw["positive"]:
+        if kw in msg_lower:
+            return "positive"
+    return "neutral"
+
+
+# Message corpus: benchmark messages, both vibe datasets and edge cases
+corpus = list(ALL_MESSAGES)
+base_dir = os.path.dirname(os.path.abspath(__file__))
+for name in ("vibe_dataset_english.csv", "vibe_dataset_tagalog.csv"):
+    with open(os.path.join(base_dir, name), encoding="utf-8") as f:
+        corpus.extend(row["text"] for row in csv.DictReader(f))
+corpus += [
+    "", "   ", "thank you ", " you ", "sa", "sa ", "ang ang ang ", "salamat salamat",
+    "WHO ARE THE CANDIDATES", "Thank You So Much!", "hindi ko alam, salamat",
+    "why is this so awesome", "bakit ang galing", "thanks pero nakakainis",
+    "paano mag vote, thank you", "eligible ba ako? thanks", "pwede ba? hirap",
+    "hello 😊", "salamat po 🙏", "İ need help", "ſalamat", "can i vote where i live?",
+]
+
+print("=" * 70)
+print("LANGUAGE / VIBE SCANNER PARITY TEST")
+print("=" * 70)
+
+mismatches = []
+for message in corpus:
+    expected_language = reference_detect_language(message)
+    if detect_language(message) != expected_language:
+        mismatches.append((message, "language"))
+        print(f"FAIL '{message}': language expected {expected_language}, got {detect_language(message)}")
+
+    for language in ("english", "tagalog", "cebuano"):
+        expected_vibe = reference_detect_vibe(message, language)
+        if detect_vibe(message, language) != expected_vibe:
+            mismatches.append((message, f"vibe/{language}"))
+            print(f"FAIL '{message}': {language} vibe expected {expected_vibe}, got {detect_vibe(message, language)}")
+
+    combined = (expected_language, reference_detect_vibe(message, expected_language))
+    if detect_language_and_vibe(message) != combined:
+        mismatches.append((message, "combined"))
+        print(f"FAIL '{message}': combined expected {combined}, got {detect_language_and_vibe(message)}")
+
+print(f"\nMessages checked: {len(corpus)}")
+print(f"Mismatches: {len(mismatches)}")
+print("Status: ALL TESTS PASSED" if not mismatches else "Status: SOME TESTS FAILED")
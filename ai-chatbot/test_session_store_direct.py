@@ -0,0 +1,102 @@
+"""Test shared SQLite session store across simulated workers - Direct test"""
+
+import asyncio
+import os
+import sqlite3
+import tempfile
+import time
+
+from nlp_utils import apply_conversational_logic
+from session_manager import SessionManager
+from session_store import SessionStore, SQLiteSessionStore
+
+db_path = os.path.join(tempfile.mkdtemp(), "sessions.db")
+
+# Two managers on one database stand in for two uvicorn workers
+worker_a = SessionManager(SQLiteSessionStore(db_path, cache_ttl=0.0))
+worker_b = SessionManager(SQLiteSessionStore(db_path, cache_ttl=0.0))
+
+print("=" * 70)
+print("SHARED SESSION STORE TEST")
+print("=" * 70)
+
+results = []
+
+# Turn 1 lands on worker A
+session = worker_a.get_session("10.0.0.7")
+worker_a.update_session(session, "Sino ang kapitan?", "kapitan_candidates", "Barangay Kapitan", "tagalog")
+worker_a.store.flush()
+
+# Turn 2 ("and for SK?") lands on worker B
+session = worker_b.get_session("10.0.0.7")
+follow_up = apply_conversational_logic("and for SK?", "unknown", "english", session)
+results.append(("Follow-up resolved on other worker", follow_up == "sk_candidates"))
+worker_b.update_session(session, "and for SK?", follow_up, "SK Chairman", "english")
+worker_b.store.flush()
+
+data = worker_a.get_session_learning_data("10.0.0.7")
+results.append(("History shared", worker_a.get_session_history("10.0.0.7") == ["sino ang kapitan?", "and for sk?"]))
+results.append(("Topics shared", data["topics_discussed"] == ["kapitan_candidates", "sk_candidates"]))
+results.append(("Languages shared", data["languages_preferred"] == ["english", "tagalog"]))
+results.append(("Depth shared", data["conversation_depth"] == 2))
+
+# Writes are buffered until flush
+worker_a.get_session("10.0.0.8")
+results.append(("Writes batched until flush", worker_b.store.get("10.0.0.8", time.time()) is None))
+worker_a.store.flush()
+results.append(("Visible after flush", worker_b.store.get("10.0.0.8", time.time()) is not None))
+
+# TTL sweep removes idle sessions for every worker
+removed = worker_b.sweep_expired(time.time() + worker_b.store.idle_ttl + 1)
+results.append(("TTL sweep", removed == 2 and worker_a.store.get("10.0.0.7", time.time()) is None))
+
+# Background flushes wait on another worker's write lock in a thread, not on the event loop
+async def flush_while_locked():
+    blocker = sqlite3.connect(db_path, isolation_level=None)
+    blocker.execute("BEGIN IMMEDIATE")
+    worker_a.get_session("10.0.0.9")
+    flush = asyncio.create_task(worker_a.store.flush_async())
+    ticks = 0
+    while ticks < 10:
+        await asyncio.sleep(0.02)
+        ticks += 1
+    waited = not flush.done()
+    in_flight_visible = worker_a.store.get("10.0.0.9", time.time()) is not None
+    blocker.execute("COMMIT")
+    blocker.close()
+    await flush
+    return waited, in_flight_visible
+
+waited, in_flight_visible = asyncio.run(flush_while_locked())
+results.append(("Event loop runs during a blocked flush", waited))
+results.append(("Session readable while being flushed", in_flight_visible))
+results.append(("Flush completes after the lock", worker_b.store.get("10.0.0.9", time.time()) is not None))
+
+worker_a.clear_session("10.0.0.9")
+removed = asyncio.run(worker_a.store.sweep_expired_async(time.time()))
+results.append(("Async delete and sweep", removed == 0 and worker_b.store.get("10.0.0.9", time.time()) is None))
+
+
+class PartialStore(SessionStore):
+    """A backend that forgot to implement most of the interface"""
+
+    def get(self, key, now):
+        return None
+
+
+try:
+    PartialStore()
+    refused = False
+except TypeError:
+    refused = True
+results.append(("Incomplete backend cannot be instantiated", refused))
+
+for name, passed in results:
+    print(f"{name:.<50} {'PASS' if passed else 'FAIL'}")
+
+worker_a.store.close()
+worker_b.store.close()
+
+passed = sum(1 for _, ok in results if ok)
+print(f"\nTests Passed: {passed}/{len(results)}")
+print("Status: ALL TESTS PASSED" if passed == len(results) else "Status: SOME TESTS FAILED")
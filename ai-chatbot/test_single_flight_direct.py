@@ -0,0 +1,123 @@
+"""Test coalescing of identical concurrent calls and shared reply bodies - Direct test"""
+
+import asyncio
+import threading
+import time
+
+from single_flight import SingleFlight, ReplayableIterable
+
+print("=" * 70)
+print("SINGLE FLIGHT TEST")
+print("=" * 70)
+
+results = []
+
+
+async def concurrent_identical_calls():
+    flight = SingleFlight(replay_seconds=0)
+    calls = 0
+
+    async def func():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return "reply"
+
+    replies = await asyncio.gather(*(flight.run("key", func) for _ in range(10)))
+    return calls, replies, flight.get_stats()
+
+calls, replies, stats = asyncio.run(concurrent_identical_calls())
+results.append(("Ten identical calls run func once", calls == 1))
+results.append(("Every caller gets the result", replies == ["reply"] * 10))
+results.append(("Counters: 1 executed, 9 coalesced", stats["executed"] == 1 and stats["coalesced"] == 9))
+results.append(("Nothing left in flight", stats["in_flight"] == 0))
+
+
+async def failing_calls():
+    flight = SingleFlight(replay_seconds=5)
+
+    async def func():
+        await asyncio.sleep(0.05)
+        raise ValueError("boom")
+
+    outcomes = await asyncio.gather(*(flight.run("key", func) for _ in range(5)), return_exceptions=True)
+    # A failure is not replayed: the next call runs again
+    retried = False
+
+    async def retry():
+        nonlocal retried
+        retried = True
+        return "ok"
+
+    after = await flight.run("key", retry)
+    return outcomes, retried and after == "ok"
+
+outcomes, retried = asyncio.run(failing_calls())
+results.append(("Exception reaches every waiter", all(isinstance(o, ValueError) and str(o) == "boom" for o in outcomes)))
+results.append(("Failure is not replayed", retried))
+
+
+async def replay_window():
+    flight = SingleFlight(replay_seconds=0.1)
+    calls = 0
+
+    async def func():
+        nonlocal calls
+        calls += 1
+        return calls
+
+    first = await flight.run("key", func)
+    replayed = await flight.run("key", func)
+    other_key = await flight.run("other", func)
+    await asyncio.sleep(0.15)
+    expired = await flight.run("key", func)
+    return first, replayed, other_key, expired, flight.get_stats()
+
+first, replayed, other_key, expired, stats = asyncio.run(replay_window())
+results.append(("Retry within the window is replayed", first == 1 and replayed == 1 and stats["replayed"] == 1))
+results.append(("Other keys are not replayed", other_key == 2))
+results.append(("Replay expires after replay_seconds", expired == 3))
+
+pulled = []
+
+
+def pieces():
+    for i in range(5):
+        pulled.append(i)
+        yield f"piece {i}\n"
+
+body = ReplayableIterable(pieces())
+reader = iter(body)
+first_piece = next(reader)
+results.append(("Source is read lazily", first_piece == "piece 0\n" and pulled == [0]))
+rest = list(reader)
+results.append(("Two readers get identical pieces", [first_piece] + rest == list(body)))
+results.append(("Source is consumed once", pulled == [0, 1, 2, 3, 4]))
+
+
+def slow_pieces():
+    for i in range(50):
+        time.sleep(0.001)
+        yield f"piece {i}\n"
+
+body = ReplayableIterable(slow_pieces())
+readings = [None] * 4
+
+
+def read(slot):
+    readings[slot] = list(body)
+
+threads = [threading.Thread(target=read, args=(slot,)) for slot in range(len(readings))]
+for thread in threads:
+    thread.start()
+for thread in threads:
+    thread.join()
+expected = [f"piece {i}\n" for i in range(50)]
+results.append(("Concurrent threads read identical pieces", all(r == expected for r in readings)))
+
+for name, passed in results:
+    print(f"{name:.<50} {'PASS' if passed else 'FAIL'}")
+
+passed = sum(1 for _, ok in results if ok)
+print(f"\nTests Passed: {passed}/{len(results)}")
+print("Status: ALL TESTS PASSED" if passed == len(results) else "Status: SOME TESTS FAILED")
@@ -0,0 +1,210 @@
+"""Multi-pattern keyword matching (Aho-Corasick automaton) and fuzzy phrase lookup"""
+
+import math
+from collections import deque
+from typing import Any, Dict, Iterable, Iterator, List, Tuple
+
+
+class KeywordAutomaton:
+    """Finds every occurrence of many keywords in one pass over the text"""
+
+    def __init__(self, keywords: Iterable[Tuple[str, Any]] = ()):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[Tuple[Tuple[int, Any], ...]] = [()]
+        self.size = 0
+
+        for keyword, value in keywords:
+            self._add(keyword, value)
+        self._build_fail_links()
+        self._values = [tuple(value for _, value in matches) for matches in self._out]
+
+    def _add(self, keyword: str, value: Any):
+        """Insert a keyword into the trie"""
+        if not keyword:
+            return
+
+        state = 0
+        for ch in keyword:
+            nxt = self._goto[state].get(ch)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto.append({})
+                self._fail.append(0)
+                self._out.append(())
+                self._goto[state][ch] = nxt
+            state = nxt
+
+        self._out[state] += ((len(keyword), value),)
+        self.size += 1
+
+    def _build_fail_links(self):
+        """Breadth-first pass linking each state to its longest proper suffix"""
+        goto, fail, out = self._goto, self._fail, self._out
+        queue = deque(goto[0].values())
+
+        while queue:
+            state = queue.popleft()
+            for ch, nxt in goto[state].items():
+                queue.append(nxt)
+                f = fail[state]
+                while f and ch not in goto[f]:
+                    f = fail[f]
+                fail[nxt] = goto[f].get(ch, 0)
+                out[nxt] += out[fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, Any]]:
+        """Yield (start index, value) for every keyword occurrence, overlaps included"""
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+
+        for i, ch in enumerate(text):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, value in out[state]:
+                yield i - length + 1, value
+
+
+    def matched_values(self, text: str) -> set:
+        """Distinct values of every keyword occurring in text (one pass, no positions)"""
+        goto, fail, values = self._goto, self._fail, self._values
+        found = set()
+        state = 0
+
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if values[state]:
+                found.update(values[state])
+        return found
+
+
+def trigrams(text: str) -> set:
+    """Character trigrams of a space-padded phrase"""
+    padded = f" {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def bounded_edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Levenshtein distance, or max_distance + 1 as soon as it is exceeded"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+
+    # Only cells within max_distance of the diagonal can stay under the bound
+    limit = max_distance + 1
+    previous = [j if j <= max_distance else limit for j in range(len(b) + 1)]
+    for i, ca in enumerate(a, 1):
+        current = [limit] * (len(b) + 1)
+        if i <= max_distance:
+            current[0] = i
+        row_min = current[0]
+        for j in range(max(1, i - max_distance), min(len(b), i + max_distance) + 1):
+            cost = previous[j - 1] + (ca != b[j - 1])
+            if previous[j] + 1 < cost:
+                cost = previous[j] + 1
+            if current[j - 1] + 1 < cost:
+                cost = current[j - 1] + 1
+            current[j] = cost if cost < limit else limit
+            if cost < row_min:
+                row_min = cost
+        if row_min > max_distance:
+            return limit
+        previous = current
+
+    return previous[-1]
+
+
+def deletion_keys(word: str) -> set:
+    """The word plus each single-character deletion of it (exact only below three characters)"""
+    keys = {word}
+    if len(word) >= 3:
+        keys.update(word[:i] + word[i + 1:] for i in range(len(word)))
+    return keys
+
+
+class FuzzyWordIndex:
+    """Shortlists stored phrases with a word close to some word of a query
+
+    Every word of a stored phrase, and the phrase with its spaces removed, is
+    indexed under its deletion_keys, so a query word reaches it when the two
+    are at most two edits apart. A phrase within a few edits of part of the
+    query nearly always has such a word. Reached phrases are ranked by the
+    inverse document frequency of the words that reached them (halved for a
+    near rather than exact word), so sharing a common first name counts for
+    far less than sharing a surname, and only the phrases that query words
+    actually reach are ever looked at.
+
+    Words shared by more than common_postings phrases (popular first names)
+    never pull in phrases on their own: they only add weight to phrases a
+    rarer word reached, unless no rarer word matched at all. A message full
+    of first names therefore costs no more than one with a single surname.
+    """
+
+    def __init__(self, phrases: Iterable[Tuple[str, Any]] = (), common_postings: int = 64):
+        self.common_postings = common_postings
+        self._entries: List[Tuple[str, Any]] = []
+        self._entry_words: List[set] = []  # entry id -> word ids
+        self._keys: Dict[str, List[int]] = {}  # deletion key -> word ids
+        self._postings: List[List[int]] = []  # word id -> entry ids
+        self._vocabulary: Dict[str, int] = {}
+        vocabulary = self._vocabulary
+
+        for phrase, value in phrases:
+            entry_id = len(self._entries)
+            self._entries.append((phrase, value))
+            self._entry_words.append(set())
+            words = phrase.split()
+            for word in set(words + ["".join(words)]):
+                word_id = vocabulary.get(word)
+                if word_id is None:
+                    word_id = vocabulary[word] = len(self._postings)
+                    self._postings.append([])
+                    for key in deletion_keys(word):
+                        self._keys.setdefault(key, []).append(word_id)
+                self._postings[word_id].append(entry_id)
+                self._entry_words[entry_id].add(word_id)
+
+        total = max(1, len(self._entries))
+        self._weights = [math.log(1 + total / len(postings)) for postings in self._postings]
+
+    def shortlist(self, text: str, limit: int) -> List[Tuple[float, str, Any]]:
+        """Return up to `limit` (score, phrase, value), best first"""
+        keys = self._keys
+        near = set()
+        exact = set()
+        for word in set(text.split()):
+            word_id = self._vocabulary.get(word)
+            if word_id is not None:
+                exact.add(word_id)
+            for key in deletion_keys(word):
+                near.update(keys.get(key, ()))
+
+        scores: Dict[int, float] = {}
+        common = []
+        for word_id in near:
+            weight = self._weights[word_id] if word_id in exact else self._weights[word_id] / 2
+            postings = self._postings[word_id]
+            if len(postings) > self.common_postings:
+                common.append((word_id, weight))
+                continue
+            for entry_id in postings:
+                scores[entry_id] = scores.get(entry_id, 0.0) + weight
+
+        if common and not scores:
+            # Only popular words matched: any of their phrases is as good as another
+            for word_id, weight in common:
+                for entry_id in self._postings[word_id][:limit]:
+                    scores[entry_id] = scores.get(entry_id, 0.0) + weight
+        else:
+            entry_words = self._entry_words
+            for word_id, weight in common:
+                for entry_id in scores:
+                    if word_id in entry_words[entry_id]:
+                        scores[entry_id] += weight
+
+        # Stable sort: ties keep first-reached order, which is deterministic for integer ids
+        best = sorted(scores, key=scores.__getitem__, reverse=True)[:limit]
+        entries = self._entries
+        return [(scores[entry_id], entries[entry_id][0], entries[entry_id][1]) for entry_id in best]
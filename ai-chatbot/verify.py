@@ -75,12 +75,175 @@ def verify_session_manager():
             return False
         
         print("  ✅ Session tracking works correctly")
+        
+        capped = SessionManager(idle_ttl=60, max_sessions=2)
+        for user in ("a", "b", "c"):
+            capped.get_session(user)
+        if capped.get_active_sessions_count() != 2 or capped.evictions["lru"] != 1:
+            print("  ❌ Session LRU cap failed")
+            return False
+        
+        import time
+        if capped.sweep_expired(time.time() + 61) != 2:
+            print("  ❌ Session TTL sweep failed")
+            return False
+        
+        print("  ✅ Session TTL and LRU eviction work correctly")
         return True
     except Exception as e:
         print(f"  ❌ SessionManager verification failed: {e}")
         return False
 
 
+def verify_rate_limiter():
+    """Verify admission control works correctly"""
+    print("\n🔍 Verifying rate limiter...")
+    try:
+        from rate_limiter import TokenBucketLimiter, ConcurrencyLimiter, ConcurrencyLimitMiddleware
+        
+        limiter = TokenBucketLimiter(rate=1.0, burst=2, sweep_interval=60)
+        verdicts = [limiter.acquire("voter", now=0.0) for _ in range(3)]
+        if verdicts[:2] != [0.0, 0.0] or verdicts[2] <= 0 or limiter.acquire("voter", now=1.0) != 0.0:
+            print("  ❌ Token bucket limiting failed")
+            return False
+        
+        if limiter.sweep(now=10.0) != 1 or len(limiter) != 0:
+            print("  ❌ Token bucket cleanup failed")
+            return False
+        
+        print("  ✅ Per-user token buckets work correctly")
+        
+        gate = ConcurrencyLimiter(limit=1)
+        if not gate.try_acquire() or gate.try_acquire() or gate.rejected != 1:
+            print("  ❌ Concurrency limit failed")
+            return False
+        gate.release()
+        
+        # The middleware holds the slot while the app awaits, and sheds with 503
+        import asyncio
+        gate = ConcurrencyLimiter(limit=1)
+        release = asyncio.Event()
+        async def slow_app(scope, receive, send):
+            await release.wait()
+        middleware = ConcurrencyLimitMiddleware(slow_app, gate, ("/chat",), b'{"detail":"busy"}')
+        statuses = []
+        async def send(message):
+            if message["type"] == "http.response.start":
+                statuses.append(message["status"])
+        async def two_requests():
+            scope = {"type": "http", "path": "/chat", "method": "POST"}
+            first = asyncio.ensure_future(middleware(scope, None, send))
+            await asyncio.sleep(0)
+            await middleware(scope, None, send)
+            release.set()
+            await first
+        asyncio.run(two_requests())
+        if statuses != [503] or gate.in_flight != 0 or gate.rejected != 1:
+            print(f"  ❌ Concurrency middleware failed: {statuses}, {gate.get_stats()}")
+            return False
+        
+        print("  ✅ Concurrency limit works correctly")
+        return True
+    except Exception as e:
+        print(f"  ❌ Rate limiter verification failed: {e}")
+        return False
+
+
+def verify_conversation_log():
+    """Verify the conversation log buffers, drops and rotates correctly"""
+    print("\n🔍 Verifying conversation log...")
+    try:
+        import json
+        import tempfile
+        from conversation_log import ConversationLog
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "conversations.jsonl")
+            log = ConversationLog(path, max_pending=2, max_bytes=300, backups=1)
+            for _ in range(3):
+                log.log("127.0.0.1", "greeting", 1.0, "english", "neutral", 0.001)
+            if log.pending != 2 or log.dropped != 1:
+                print("  ❌ Full buffer did not drop entries")
+                return False
+            
+            log.flush()
+            with open(path, encoding="utf-8") as f:
+                entry = json.loads(f.readline())
+            if entry["intent"] != "greeting" or entry["latency_ms"] != 1.0 or log.written != 2:
+                print(f"  ❌ Unexpected log entry: {entry}")
+                return False
+            
+            print("  ✅ Entries are buffered, written and dropped correctly")
+            
+            for _ in range(2):
+                log.log("127.0.0.1", "greeting", 1.0, "english", "neutral", 0.001)
+                log.flush()
+            log.close()
+            if log.rotations != 1 or not os.path.exists(path + ".1") or os.path.exists(path + ".2"):
+                print("  ❌ Log rotation failed")
+                return False
+        
+        print("  ✅ Size-based rotation works correctly")
+        
+        if ConversationLog("logs/conversations.{pid}.jsonl").path != f"logs/conversations.{os.getpid()}.jsonl":
+            print("  ❌ {pid} was not expanded in the log path")
+            return False
+        
+        print("  ✅ Each process gets its own log file")
+        
+        with tempfile.TemporaryDirectory() as tmp:
+            template = os.path.join(tmp, "conversations.{pid}.jsonl")
+            log = ConversationLog(template, retention=3600)
+            dead_pid = 2 ** 22 + 1  # Above Linux's pid_max, so never a running process
+            stale = [template.replace("{pid}", str(dead_pid)) + suffix for suffix in ("", ".1")]
+            recent = template.replace("{pid}", str(dead_pid + 1))
+            own = log.path
+            for file_path in stale + [recent, own]:
+                open(file_path, "w").close()
+            for file_path in stale + [own]:
+                os.utime(file_path, (0, 0))
+            removed = log.prune_stale()
+            kept = os.path.exists(recent) and os.path.exists(own)
+            if removed != 2 or any(os.path.exists(p) for p in stale) or not kept:
+                print("  ❌ Stale log pruning removed the wrong files")
+                return False
+        
+        print("  ✅ Old files of exited processes are pruned")
+        return True
+    except Exception as e:
+        print(f"  ❌ Conversation log verification failed: {e}")
+        return False
+
+
+def verify_prebuilt_json():
+    """Verify pre-encoded bodies match a fresh encoding and refresh correctly"""
+    print("\n🔍 Verifying prebuilt JSON bodies...")
+    try:
+        from prebuilt_json import PrebuiltJSON, encode_json
+        
+        version = [1]
+        counter = [0]
+        body = PrebuiltJSON(
+            lambda: {"status": "healthy", "total": 10 * version[0], "active": lambda: counter[0], "tags": ["a"]},
+            lambda: version[0]
+        )
+        counter[0] = 7
+        if body.render() != encode_json({"status": "healthy", "total": 10, "active": 7, "tags": ["a"]}):
+            print(f"  ❌ Unexpected body: {body.render()}")
+            return False
+        
+        version[0] = 2
+        if b'"total":20' not in body.render() or body.builds != 2:
+            print("  ❌ Body was not rebuilt after a version change")
+            return False
+        
+        print("  ✅ Static fields are cached, live fields and rebuilds work correctly")
+        return True
+    except Exception as e:
+        print(f"  ❌ Prebuilt JSON verification failed: {e}")
+        return False
+
+
 def verify_nlp_utils():
     """Verify NLP utilities work correctly"""
     print("\n🔍 Verifying NLP utilities...")
@@ -108,6 +271,16 @@ def verify_nlp_utils():
             return False
         print(f"  ✅ Vibe detection works (detected: {vibe})")
         
+        # Long messages are classified but never cached
+        from nlp_utils import classify_message, get_classification_cache_stats
+        from config import CLASSIFICATION_CACHE_MAX_CHARS
+        long_message = "paano bumoto " * (CLASSIFICATION_CACHE_MAX_CHARS // 10)
+        size_before = get_classification_cache_stats()["size"]
+        if classify_message(long_message)[0] != "voting_process" or get_classification_cache_stats()["size"] != size_before:
+            print("  ❌ Long message was cached or misclassified")
+            return False
+        print("  ✅ Classification cache skips long messages")
+        
         return True
     except Exception as e:
         print(f"  ❌ NLP utilities verification failed: {e}")
@@ -134,6 +307,10 @@ def verify_responses():
         print(f"  ✅ All {len(RESPONSES)} response types present")
         print(f"     - Required: {len(required_intents)} ✅")
         
+        from responses import CLEANED_TEMPLATES, verify_cleaned_templates
+        verify_cleaned_templates()
+        print(f"  ✅ {len(CLEANED_TEMPLATES)} cleaned templates match the original per-call cleaning")
+        
         return True
     except Exception as e:
         print(f"  ❌ Response template verification failed: {e}")
@@ -182,6 +359,9 @@ def main():
         "NLP Utilities": verify_nlp_utils(),
         "CandidateManager": verify_candidate_manager(),
         "SessionManager": verify_session_manager(),
+        "Rate Limiter": verify_rate_limiter(),
+        "Conversation Log": verify_conversation_log(),
+        "Prebuilt JSON": verify_prebuilt_json(),
     }
     
     print("\n" + "=" * 60)